@@ -0,0 +1,88 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+import metrics
+
+# Cache persistant des analyses IA, indexé par le contenu normalisé de l'article
+ANALYSIS_CACHE_PATH = os.environ.get("ANALYSIS_CACHE_PATH", os.path.join(".cache", "analysis_cache.sqlite3"))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get("ANALYSIS_CACHE_MAX_ENTRIES", 5000))
+
+# Champs propres à l'article d'origine, jamais stockés dans le cache
+_PER_LINK_FIELDS = ("link", "raw_source", "id", "created_at", "is_saved")
+
+def _normalize(text) -> str:
+    text = re.sub(r"<[^>]+>", " ", text or "")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+def content_key(article_data, prompt_version: str) -> str:
+    """Hash du titre + contenu normalisés (les paramètres de tracking du lien n'y entrent pas)"""
+    raw = "\x1f".join([prompt_version,
+                       _normalize(article_data.get("title")),
+                       _normalize((article_data.get("content") or "")[:3000])])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class AnalysisCache:
+    """Cache SQLite borné : les entrées les moins récemment utilisées sont évincées"""
+
+    def __init__(self, path=ANALYSIS_CACHE_PATH, max_entries=ANALYSIS_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY, analysis TEXT NOT NULL, last_used REAL NOT NULL)""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON analyses(last_used)")
+        return self._conn
+
+    def get(self, key: str):
+        try:
+            with self._lock:
+                db = self._db()
+                row = db.execute("SELECT analysis FROM analyses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    metrics.CACHE_REQUESTS.inc(cache="analysis", result="miss")
+                    return None
+                db.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (time.time(), key))
+                db.commit()
+                self.hits += 1
+                metrics.CACHE_REQUESTS.inc(cache="analysis", result="hit")
+                return json.loads(row[0])
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache d'analyses indisponible: {e}")
+            return None
+
+    def put(self, key: str, analysis: dict):
+        value = {k: v for k, v in analysis.items() if k not in _PER_LINK_FIELDS}
+        try:
+            with self._lock:
+                db = self._db()
+                db.execute("INSERT OR REPLACE INTO analyses (key, analysis, last_used) VALUES (?, ?, ?)",
+                           (key, json.dumps(value, ensure_ascii=False), time.time()))
+                # Éviction LRU au-delà de la taille maximale
+                db.execute("""DELETE FROM analyses WHERE key IN (
+                    SELECT key FROM analyses ORDER BY last_used DESC LIMIT -1 OFFSET ?)""",
+                           (self.max_entries,))
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache d'analyses indisponible: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            try:
+                size = self._db().execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            except sqlite3.Error:
+                size = 0
+            return {"hits": self.hits, "misses": self.misses, "size": size}
@@ -0,0 +1,112 @@
+import re
+import json
+import unicodedata
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+CATEGORIES = ["Stockage", "Compute", "ML", "Gouvernance", "Sécurité", "ETL", "Base de Données"]
+PROVIDERS = ["AWS", "Azure", "GCP"]
+
+# Variantes fréquentes renvoyées par le modèle
+_PROVIDER_ALIASES = {
+    "aws": "AWS", "amazon": "AWS", "amazon web services": "AWS",
+    "azure": "Azure", "microsoft": "Azure", "microsoft azure": "Azure",
+    "gcp": "GCP", "google": "GCP", "google cloud": "GCP", "google cloud platform": "GCP",
+}
+_IMPACT_WORDS = {"faible": 1, "mineur": 1, "moyen": 2, "majeur": 2, "critique": 3, "strategique": 3}
+
+def _fold(text) -> str:
+    """Minuscules sans accents, pour comparer les libellés"""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+_CATEGORY_LOOKUP = {_fold(c): c for c in CATEGORIES}
+
+class NewsAnalysis(BaseModel):
+    """Analyse d'une news telle qu'attendue du modèle (valeurs normalisées si possible)"""
+    link: Optional[str] = None
+    title: str = Field(min_length=1)
+    summary: str = Field(min_length=1)
+    provider: Literal["AWS", "Azure", "GCP"]
+    service: str = Field(min_length=1)
+    category: Literal["Stockage", "Compute", "ML", "Gouvernance", "Sécurité", "ETL", "Base de Données"]
+    impact_level: int = Field(ge=1, le=3)
+    impact_analysis: str = Field(min_length=1)
+
+    @field_validator("provider", mode="before")
+    @classmethod
+    def _normalize_provider(cls, v):
+        folded = _fold(v)
+        if folded in _PROVIDER_ALIASES:
+            return _PROVIDER_ALIASES[folded]
+        # Ex: "AWS/Azure/GCP" recopié tel quel ou "Amazon (AWS)" : premier fournisseur reconnu
+        for alias, provider in _PROVIDER_ALIASES.items():
+            if re.search(rf"\b{alias}\b", folded):
+                return provider
+        return v
+
+    @field_validator("category", mode="before")
+    @classmethod
+    def _normalize_category(cls, v):
+        return _CATEGORY_LOOKUP.get(_fold(v), v)
+
+    @field_validator("impact_level", mode="before")
+    @classmethod
+    def _normalize_impact(cls, v):
+        if isinstance(v, str):
+            digit = re.search(r"[1-3]", v)
+            if digit:
+                return int(digit.group())
+            for word, level in _IMPACT_WORDS.items():
+                if word in _fold(v):
+                    return level
+        return v
+
+# Schémas transmis au modèle (sortie JSON contrainte)
+ANALYSIS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "title": {"type": "STRING"},
+        "summary": {"type": "STRING"},
+        "provider": {"type": "STRING", "enum": PROVIDERS},
+        "service": {"type": "STRING"},
+        "category": {"type": "STRING", "enum": CATEGORIES},
+        "impact_level": {"type": "INTEGER"},
+        "impact_analysis": {"type": "STRING"},
+    },
+    "required": ["title", "summary", "provider", "service", "category", "impact_level", "impact_analysis"],
+}
+
+BATCH_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"link": {"type": "STRING"}, **ANALYSIS_SCHEMA["properties"]},
+        "required": ["link"] + ANALYSIS_SCHEMA["required"],
+    },
+}
+
+def extract_json(text):
+    """Extrait le premier objet ou tableau JSON d'une réponse, même entouré de texte ou de Markdown"""
+    text = (text or "").strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    decoder = json.JSONDecoder()
+    for candidate in (text, re.sub(r",\s*([}\]])", r"\1", text)):
+        for match in re.finditer(r"[\[{]", candidate):
+            try:
+                return decoder.raw_decode(candidate, match.start())[0]
+            except ValueError:
+                continue
+    raise ValueError("aucun JSON exploitable dans la réponse")
+
+def validate_analysis(item):
+    """Retourne l'analyse normalisée (dict) ou None si elle ne respecte pas le schéma"""
+    try:
+        return NewsAnalysis.model_validate(item).model_dump(exclude_none=True)
+    except ValidationError as e:
+        print(f"⚠️ Analyse IA invalide : {e.error_count()} erreur(s) ({e.errors()[0]['loc']})")
+        return None
@@ -1,41 +1,91 @@
-import google.generativeai as genai
 import os
-import json
 import warnings
+import threading
 from dotenv import load_dotenv
 
+import metrics
+from rate_limiter import RateLimiter
+from analysis_cache import AnalysisCache, content_key
+from analysis_schema import ANALYSIS_SCHEMA, BATCH_SCHEMA, extract_json, validate_analysis
+
 # Supprime les avertissements de dépréciation de Google qui polluent les logs
 warnings.filterwarnings("ignore")
 
 load_dotenv()
-genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
 
 # Utilisation du modèle Flash (plus rapide et économe)
 MODEL_NAME = 'gemini-2.5-flash'
-model = genai.GenerativeModel(MODEL_NAME)
 
-def analyze_article_with_ai(article_data):
-    """Analyse une news pour extraction JSON"""
-    title = article_data.get("title")
-    content = (article_data.get("content") or "")[:3000]
-    provider_hint = article_data.get("raw_provider", "Unknown")
+_model = None
+_model_lock = threading.Lock()
 
-    prompt = f"""
-    Role: Expert Data Engineering.
-    Tâche: Extrais les infos de cette news Cloud en JSON.
-    
-    Source: {provider_hint}
-    Titre: {title}
-    Contenu: {content}
+def get_model():
+    """Modèle créé au premier appel : le SDK Gemini (près d'une seconde d'import) ne ralentit pas le démarrage"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                api_key = os.environ.get("GEMINI_API_KEY")
+                if not api_key:
+                    raise ValueError("⚠️ Clé Gemini manquante")
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+def set_model(new_model):
+    """Remplace le modèle (tests, benchmarks) : tout objet exposant `generate_content`"""
+    global _model
+    _model = new_model
+
+# Quotas Gemini (à ajuster selon le plan, sans modifier le code)
+# Par défaut : 6 req/min, l'équivalent de l'ancienne pause fixe de 10s
+GEMINI_RPM = float(os.environ.get("GEMINI_RPM", 6))
+GEMINI_TPM = float(os.environ.get("GEMINI_TPM", 250000))
+GEMINI_WORKERS = int(os.environ.get("GEMINI_WORKERS", 2))
+
+limiter = RateLimiter(rpm=GEMINI_RPM, tpm=GEMINI_TPM)
 
+class QuotaExceededError(Exception):
+    """Le modèle a refusé la requête pour dépassement de quota (429)"""
+
+# À incrémenter à chaque modification du prompt : les analyses en cache deviennent obsolètes
+PROMPT_VERSION = "2"
+
+cache = AnalysisCache()
+
+def cached_analysis(article_data):
+    """Analyse déjà connue pour ce contenu (même sous un autre lien), ou None"""
+    analysis = cache.get(content_key(article_data, PROMPT_VERSION))
+    if analysis is not None:
+        analysis["link"] = article_data.get("link")
+        analysis["raw_source"] = article_data.get("raw_provider", "Unknown")
+    return analysis
+
+def _store_analysis(article_data, analysis):
+    cache.put(content_key(article_data, PROMPT_VERSION), analysis)
+
+def is_quota_error(e: Exception) -> bool:
+    if "429" in str(e):
+        return True
+    from google.api_core import exceptions as google_exceptions
+    return isinstance(e, google_exceptions.ResourceExhausted)
+
+def estimate_tokens(article_data) -> int:
+    """Estimation grossière (≈4 caractères par token) : prompt + réponse JSON"""
+    text = (article_data.get("title") or "") + (article_data.get("content") or "")[:3000]
+    return len(text) // 4 + 600
+
+# Consignes communes aux analyses unitaires et par lot
+ANALYSIS_RULES = """
     Règles:
     1. Resumé en français (2 phrases max).
     2. Catégorie PARMI: [Stockage, Compute, ML, Gouvernance, Sécurité, ETL, Base de Données].
     3. Impact: 1 (Faible), 2 (Moyen), 3 (Critique/Stratégique).
     4. Analyse Impact: 1 phrase pour un CTO.
+"""
 
-    JSON attendu:
-    {{
+ANALYSIS_FIELDS = """
         "title": "Titre FR",
         "summary": "Résumé FR",
         "provider": "AWS/Azure/GCP",
@@ -43,30 +93,203 @@ def analyze_article_with_ai(article_data):
         "category": "Catégorie",
         "impact_level": 1,
         "impact_analysis": "Analyse..."
-    }}
+"""
+
+# Sortie JSON contrainte par schéma (plus de texte parasite autour du JSON)
+# (dictionnaires équivalents à genai.GenerationConfig, sans importer le SDK)
+ANALYSIS_CONFIG = {"response_mime_type": "application/json", "response_schema": ANALYSIS_SCHEMA}
+BATCH_CONFIG = {"response_mime_type": "application/json", "response_schema": BATCH_SCHEMA}
+
+def _parse_analysis(item, article_data):
+    """Valide un élément de réponse ; le fournisseur du flux sert de valeur par défaut"""
+    if not isinstance(item, dict):
+        return None
+    item.setdefault("provider", article_data.get("raw_provider"))
+    analysis = validate_analysis(item)
+    if analysis is not None:
+        analysis["link"] = article_data.get("link")
+        analysis["raw_source"] = article_data.get("raw_provider", "Unknown")
+    return analysis
+
+def analyze_article_with_ai(article_data):
+    """Analyse une news pour extraction JSON (sans appel IA si le contenu est en cache)"""
+    cached = cached_analysis(article_data)
+    if cached is not None:
+        return cached
+    return _analyze_uncached(article_data)
+
+def _analyze_uncached(article_data):
+    title = article_data.get("title")
+    content = (article_data.get("content") or "")[:3000]
+    provider_hint = article_data.get("raw_provider", "Unknown")
+
+    prompt = f"""
+    Role: Expert Data Engineering.
+    Tâche: Extrais les infos de cette news Cloud en JSON.
+    
+    Source: {provider_hint}
+    Titre: {title}
+    Contenu: {content}
+    {ANALYSIS_RULES}
+    JSON attendu:
+    {{{ANALYSIS_FIELDS}    }}
     """
     try:
-        res = model.generate_content(prompt)
-        # Nettoyage Markdown
-        text = res.text.replace("```json", "").replace("```", "").strip()
-        analysis = json.loads(text)
-        analysis["link"] = article_data.get("link")
-        analysis["raw_source"] = provider_hint
+        with metrics.span("model_call", kind="single"):
+            res = get_model().generate_content(prompt, generation_config=ANALYSIS_CONFIG)
+        data = extract_json(res.text)
+        if isinstance(data, list) and data:
+            data = data[0]
+        analysis = _parse_analysis(data, article_data)
+        if analysis is not None:
+            _store_analysis(article_data, analysis)
+        else:
+            metrics.AI_PARSE_FAILURES.inc(kind="single")
         return analysis
     except Exception as e:
+        # Le quota est géré par l'appelant (pause + nouvelle tentative)
+        if is_quota_error(e):
+            metrics.QUOTA_ERRORS.inc()
+            raise QuotaExceededError(str(e)) from e
         # On log l'erreur mais on ne crash pas l'app
         print(f"⚠️ Erreur IA sur '{title[:15]}...': {e}")
+        metrics.AI_PARSE_FAILURES.inc(kind="single")
         return None
 
-def ask_gemini_strategy(question, context):
+# --- ANALYSE PAR LOT ---
+# Nombre d'articles par requête et budget de tokens de contenu pour tout le lot
+GEMINI_BATCH_SIZE = int(os.environ.get("GEMINI_BATCH_SIZE", 5))
+BATCH_TOKEN_BUDGET = int(os.environ.get("GEMINI_BATCH_TOKEN_BUDGET", 6000))
+
+def _trimmed_content(article_data, nb_articles):
+    # Le budget de tokens est réparti entre les articles (≈4 caractères par token)
+    max_chars = max(300, min(3000, BATCH_TOKEN_BUDGET * 4 // max(1, nb_articles)))
+    return (article_data.get("content") or "")[:max_chars]
+
+def analyze_articles_batch(articles):
+    """Analyse plusieurs news en une seule requête.
+
+    Retourne {link: analyse} pour les éléments valides uniquement ; les articles
+    absents du résultat (réponse mal formée, élément invalide) sont à analyser
+    individuellement par l'appelant.
+    """
+    blocks = ""
+    for i, article_data in enumerate(articles, 1):
+        blocks += f"""
+    ### Article {i}
+    Lien: {article_data.get("link")}
+    Source: {article_data.get("raw_provider", "Unknown")}
+    Titre: {article_data.get("title")}
+    Contenu: {_trimmed_content(article_data, len(articles))}
+"""
+
+    prompt = f"""
+    Role: Expert Data Engineering.
+    Tâche: Extrais les infos de chacune de ces {len(articles)} news Cloud en JSON.
+    {blocks}
+    {ANALYSIS_RULES}    5. Recopie exactement le "link" de chaque article.
+
+    JSON attendu: un tableau avec un objet par article.
+    [
+      {{
+        "link": "Lien de l'article",{ANALYSIS_FIELDS}      }}
+    ]
+    """
     try:
-        prompt = f"""
+        with metrics.span("model_call", kind="batch", articles=len(articles)):
+            res = get_model().generate_content(prompt, generation_config=BATCH_CONFIG)
+        items = extract_json(res.text)
+        if isinstance(items, dict):
+            items = [items]
+        if not isinstance(items, list):
+            raise ValueError("la réponse n'est pas un tableau JSON")
+    except Exception as e:
+        if is_quota_error(e):
+            metrics.QUOTA_ERRORS.inc()
+            raise QuotaExceededError(str(e)) from e
+        print(f"⚠️ Réponse du lot inexploitable ({len(articles)} articles), repli unitaire : {e}")
+        metrics.AI_PARSE_FAILURES.inc(kind="batch")
+        return {}
+
+    by_link = {a.get("link"): a for a in articles}
+    results = {}
+    for item in items:
+        link = item.get("link") if isinstance(item, dict) else None
+        if link not in by_link or link in results:
+            continue
+        analysis = _parse_analysis(item, by_link[link])
+        if analysis is not None:
+            _store_analysis(by_link[link], analysis)
+            results[link] = analysis
+        else:
+            metrics.AI_PARSE_FAILURES.inc(kind="batch_item")
+    return results
+
+def estimate_batch_tokens(articles) -> int:
+    text = sum(len(a.get("title") or "") + len(_trimmed_content(a, len(articles))) for a in articles)
+    return text // 4 + 400 * len(articles) + 400
+
+# Nombre de tentatives d'un article après une erreur de quota
+MAX_QUOTA_RETRIES = 3
+
+def _analyze_with_quota_retries(article_data):
+    for _ in range(MAX_QUOTA_RETRIES):
+        limiter.acquire(estimate_tokens(article_data))
+        try:
+            result = _analyze_uncached(article_data)
+            limiter.success()
+            return result
+        except QuotaExceededError:
+            limiter.backoff()
+    print(f"⚠️ Quota épuisé, article reporté : {(article_data.get('title') or '')[:20]}...")
+    return None
+
+def analyze_batch_with_rate_limit(articles):
+    """Analyse un lot en une requête, puis en unitaire pour les articles non couverts.
+
+    Les articles sont supposés absents du cache (voir `cached_analysis`).
+    Retourne une analyse (ou None) par article, dans le même ordre.
+    """
+    results = {}
+    if len(articles) > 1:
+        for _ in range(MAX_QUOTA_RETRIES):
+            limiter.acquire(estimate_batch_tokens(articles))
+            try:
+                results = analyze_articles_batch(articles)
+                limiter.success()
+                break
+            except QuotaExceededError:
+                limiter.backoff()
+
+    return [results.get(a.get("link")) or _analyze_with_quota_retries(a) for a in articles]
+
+# Début des réponses d'erreur du conseiller (jamais mises en cache)
+UNAVAILABLE_MESSAGE = "Indisponible pour le moment"
+
+def _strategy_prompt(question, context):
+    return f"""
         Tu es un Consultant Stratégique en Cloud.
         Contexte Actu : {context}
         Question : "{question}"
         Réponds en Markdown.
         """
-        res = model.generate_content(prompt)
+
+def ask_gemini_strategy(question, context):
+    try:
+        with metrics.span("model_call", kind="chat"):
+            res = get_model().generate_content(_strategy_prompt(question, context))
         return res.text
     except Exception as e:
-        return f"Indisponible pour le moment ({e})"
\ No newline at end of file
+        return f"{UNAVAILABLE_MESSAGE} ({e})"
+
+def stream_gemini_strategy(question, context):
+    """Générateur des morceaux de réponse Markdown, au fil de la génération.
+
+    Fermer le générateur (client déconnecté) interrompt la lecture du flux du modèle.
+    """
+    try:
+        for chunk in get_model().generate_content(_strategy_prompt(question, context), stream=True):
+            if chunk.text:
+                yield chunk.text
+    except Exception as e:
+        yield f"{UNAVAILABLE_MESSAGE} ({e})"
@@ -0,0 +1,161 @@
+"""Benchmark du détecteur de quasi-doublons sur l'historique de seed_database.py.
+
+Usage : python benchmarks/bench_dedup.py
+Chaque news de l'historique est republiée sous un autre lien avec un texte
+retouché (reprise sur un blog, mots retirés). Pour chaque seuil on mesure :
+  - rappel : part des reprises reconnues comme doublon de l'original ;
+  - faux positifs : news distinctes prises pour des doublons, dans l'historique et
+    parmi des annonces gabarit telles que les publient les flux (What's New AWS,
+    Azure Updates, notes de version GCP) : même texte, seul le type d'instance,
+    la version ou la région change ;
+  - rappel des titres reformulés : même lancement publié dans What's New et sur un
+    blog sous un autre titre, avec le même texte précédé d'une introduction.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dedup
+from seed_database import historical_news
+
+THRESHOLDS = [0.3, 0.4, 0.5, 0.6, 0.7, 0.8]
+BLOG_SUFFIX = (" Dans cet article, nous présentons la nouveauté, ses cas d'usage"
+               " et la marche à suivre pour l'activer dans votre compte.")
+
+# Annonces distinctes d'un même gabarit, texte brut des flux en anglais
+TEMPLATES = [
+    ("Amazon EC2 {0} instances are now available in additional regions",
+     "Starting today, Amazon Elastic Compute Cloud (Amazon EC2) {0} instances are available in additional "
+     "AWS Regions. These instances are powered by AWS Graviton3 processors and are built on the AWS Nitro "
+     "System. To learn more, see the Amazon EC2 {0} instances page and the Regional Services list.",
+     ["C7g", "M7g", "R7g", "C7gn", "M7gd"]),
+    ("Amazon RDS for PostgreSQL supports minor versions {0}",
+     "Amazon Relational Database Service (RDS) for PostgreSQL now supports the latest minor versions {0}. "
+     "We recommend that you upgrade to the latest minor versions to fix known security vulnerabilities in "
+     "prior versions of PostgreSQL, and to benefit from the bug fixes added by the PostgreSQL community.",
+     ["16.4, 15.8, 14.13, 13.16, and 12.20", "17.2, 16.6, 15.10, 14.15, and 13.18",
+      "16.3, 15.7, 14.12, 13.15, and 12.19"]),
+    ("Amazon Bedrock is now available in the {0} Region",
+     "Amazon Bedrock is now available in the {0} Region, giving customers more choice to build and scale "
+     "generative AI applications using a selection of foundation models. For the full list of models "
+     "available in each Region, refer to the Amazon Bedrock documentation.",
+     ["Asia Pacific (Mumbai)", "Asia Pacific (Seoul)", "Europe (Paris)", "South America (São Paulo)"]),
+    ("AWS Lambda adds support for {0}",
+     "AWS Lambda now supports creating serverless applications using {0}. Developers can use {0} as both a "
+     "managed runtime and a container base image, and AWS will automatically apply updates to the managed "
+     "runtime and base image as they become available.",
+     ["Python 3.12", "Python 3.13", "Node.js 22", "Java 21"]),
+    ("Generally available: Azure Kubernetes Service support for Kubernetes {0}",
+     "Kubernetes {0} is now generally available in Azure Kubernetes Service (AKS). Review the release notes "
+     "and the Kubernetes version support policy before upgrading your clusters, and test workloads in a "
+     "non-production environment first.",
+     ["1.29", "1.30", "1.31"]),
+    ("Cloud SQL for MySQL {0} is generally available",
+     "Cloud SQL for MySQL now supports MySQL {0}. You can create new instances with this version or upgrade "
+     "existing instances in place. See the Cloud SQL release notes for the list of supported database flags.",
+     ["8.0.37", "8.0.39", "8.4"]),
+]
+
+# Même lancement, deux titres rédigés différemment (What's New / blog), même texte
+RETITLED = [
+    ("Amazon Redshift announces zero-ETL integration with Amazon DynamoDB",
+     "Zero-ETL integration between Amazon DynamoDB and Amazon Redshift is now generally available",
+     "Amazon Redshift now supports zero-ETL integration with Amazon DynamoDB, so you can run analytics on "
+     "DynamoDB data without building and maintaining pipelines. Data written to DynamoDB tables is replicated "
+     "to Redshift within seconds and can be combined with other data in your warehouse."),
+    ("AWS Lambda SnapStart now available for Python and .NET functions",
+     "Faster cold starts for Python and .NET Lambda functions with SnapStart",
+     "AWS Lambda SnapStart for Python and .NET functions delivers faster function startup performance, from "
+     "several seconds to as low as sub-second, with minimal or no code changes. SnapStart caches a snapshot of "
+     "the initialized execution environment and resumes new invocations from it."),
+    ("Amazon S3 Express One Zone now supports appending data to objects",
+     "Append data to existing objects in the S3 Express One Zone storage class",
+     "You can now append data to existing objects in Amazon S3 Express One Zone, without downloading and "
+     "rewriting the object. Applications such as log processing and media broadcasting can add new data to "
+     "the end of an object as it is produced, and read it immediately."),
+    ("Announcing Azure Container Apps serverless GPUs",
+     "Serverless GPUs are now available in Azure Container Apps",
+     "Azure Container Apps now offers serverless GPUs for AI workloads. Serverless GPUs scale to zero when "
+     "not in use and you pay per second of usage, with NVIDIA A100 and T4 GPUs and no infrastructure to "
+     "manage. Bring your own models or deploy from Azure AI Foundry."),
+    ("BigQuery now supports continuous queries",
+     "Introducing continuous queries in BigQuery for real-time analytics",
+     "BigQuery continuous queries run SQL statements that process, analyze, and transform data as new events "
+     "arrive, in real time. Results can be exported to Pub/Sub, Bigtable or another BigQuery table, which "
+     "lets you build event-driven pipelines without leaving BigQuery."),
+]
+BLOG_INTRO = "In this post, we walk through the new capability and how to get started. "
+
+def retitled_pairs():
+    return [({"title": a, "content": body, "link": f"https://whatsnew.example/{i}"},
+             {"title": b, "content": BLOG_INTRO + body, "link": f"https://blog.example/{i}"})
+            for i, (a, b, body) in enumerate(RETITLED)]
+
+def templated_news():
+    return [{"title": title.format(value), "content": content.format(value),
+             "link": f"https://feeds.example/{t}/{i}"}
+            for t, (title, content, values) in enumerate(TEMPLATES) for i, value in enumerate(values)]
+
+def repost(news):
+    """Même annonce reprise sur un blog : titre suffixé, texte complété"""
+    return {"title": f"{news['title']} | Blog", "content": news["content"] + BLOG_SUFFIX,
+            "link": news["link"] + "?repost"}
+
+def reworded(news):
+    """Même annonce reformulée : un mot sur cinq retiré du titre et du résumé"""
+    def drop(text):
+        return " ".join(w for i, w in enumerate(text.split()) if i % 5 != 2)
+    return {"title": drop(news["title"]), "content": drop(news["content"]),
+            "link": news["link"] + "?reworded"}
+
+def evaluate(threshold):
+    index = dedup.NearDuplicateIndex(threshold=threshold)
+    originals = [{"title": n["title"], "content": n["summary"], "link": n["link"]} for n in historical_news]
+    templated = templated_news()
+    false_positives = sum(1 for article in originals if index.check_and_add(article) is not None)
+    templated_false_positives = sum(1 for article in templated if index.check_and_add(article) is not None)
+
+    sources = originals + templated
+    variants = [repost(n) for n in sources] + [reworded(n) for n in sources]
+    expected = [n["link"] for n in sources] * 2
+    found = 0
+    for variant, link in zip(variants, expected):
+        match = index.find(variant)
+        if match and match[0] == link:
+            found += 1
+
+    pairs = retitled_pairs()
+    for original, _ in pairs:
+        index.add(original)
+    retitled_found = 0
+    for original, blog_post in pairs:
+        match = index.find(blog_post)
+        if match and match[0] == original["link"]:
+            retitled_found += 1
+    return found / len(variants), retitled_found / len(pairs), false_positives, templated_false_positives
+
+def main():
+    sources = len(historical_news) + len(templated_news())
+    print(f"Historique : {len(historical_news)} news, {len(templated_news())} annonces gabarit, "
+          f"{2 * sources} reprises simulées, {len(RETITLED)} titres reformulés")
+    print(f"{'seuil':>6} {'rappel':>8} {'reformulés':>11} {'faux positifs':>14} {'dont gabarits':>14}")
+    for threshold in THRESHOLDS:
+        recall, retitled, false_positives, templated_false_positives = evaluate(threshold)
+        marker = "  <- NEAR_DUP_THRESHOLD" if threshold == dedup.NEAR_DUP_THRESHOLD else ""
+        print(f"{threshold:>6.1f} {recall:>8.0%} {retitled:>11.0%} {false_positives + templated_false_positives:>14} "
+              f"{templated_false_positives:>14}{marker}")
+
+    # Débit : signature + recherche dans un index rempli
+    index = dedup.NearDuplicateIndex()
+    articles = [{"title": f"{n['title']} #{i}", "summary": n["summary"], "link": f"{n['link']}#{i}"}
+                for i in range(40) for n in historical_news]
+    start = time.perf_counter()
+    duplicates = sum(1 for article in articles if index.check_and_add(article) is not None)
+    elapsed = time.perf_counter() - start
+    print(f"\nDébit : {len(articles) / elapsed:.0f} articles/s "
+          f"({len(articles)} articles, {duplicates} doublons, index de {len(index)})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark du scraping parallèle contre un serveur RSS local avec des flux lents.
+
+Usage : python benchmarks/bench_fetch.py
+Le temps total doit suivre le flux le plus lent, pas la somme des délais.
+"""
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper
+
+# Délai (secondes) de chaque flux simulé
+DELAYS = [0.2, 0.5, 1.0, 1.5, 0.3, 0.8]
+
+RSS_TEMPLATE = """<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Stub</title>
+{items}
+</channel></rss>"""
+
+def build_feed(feed_id, count=5):
+    items = "".join(
+        f"<item><title>Feed {feed_id} item {i}</title>"
+        f"<link>http://stub/{feed_id}/{i}</link>"
+        f"<description>Contenu {i}</description></item>"
+        for i in range(count)
+    )
+    return RSS_TEMPLATE.format(items=items).encode()
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        feed_id = int(self.path.strip("/").split("/")[-1])
+        time.sleep(DELAYS[feed_id])
+        body = build_feed(feed_id)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # Tous les flux sur le même hôte : on lève la limite par hôte pour mesurer le parallélisme pur
+    scraper.MAX_PER_HOST = len(DELAYS)
+    feeds = [{"url": f"{base}/feed/{i}", "provider": "AWS"} for i in range(len(DELAYS))]
+
+    start = time.perf_counter()
+    articles = scraper.fetch_rss_data(feeds)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    print()
+    print(f"Flux            : {len(feeds)}")
+    print(f"Articles        : {len(articles)}")
+    print(f"Somme des délais: {sum(DELAYS):.2f}s")
+    print(f"Flux le + lent  : {max(DELAYS):.2f}s")
+    print(f"Temps mesuré    : {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
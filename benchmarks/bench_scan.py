@@ -0,0 +1,374 @@
+"""Benchmark de bout en bout du scan, sans réseau ni quota.
+
+Usage : python benchmarks/bench_scan.py [--sizes 10 100 1000 10000] [--latency 0.05]
+                                         [--error-rate 0.0] [--quota-rate 0.0]
+
+Le scan réel (`main.run_scan_process_sync`) tourne contre des doublures locales :
+  - un serveur HTTP qui sert des flux RSS/Atom synthétiques ;
+  - un modèle factice à latence configurable, avec réponses invalides et 429 simulés ;
+  - un stockage des news en mémoire à la place de Supabase.
+Pour chaque taille de scan : articles/s, percentiles de latence par étape et mémoire.
+La durée inclut la pause d'une seconde en fin de scan. --tracemalloc mesure le pic
+d'allocations Python de chaque scan, mais ralentit fortement les étapes en pur Python.
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import tempfile
+import threading
+import tracemalloc
+import resource
+from collections import defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Aucun état ni identifiant réel : fichiers dans un dossier temporaire, clés factices
+_WORKDIR = tempfile.mkdtemp(prefix="bench_scan_")
+for name, filename in [("SCAN_JOBS_PATH", "scan_jobs.sqlite3"), ("ANALYSIS_CACHE_PATH", "analysis_cache.sqlite3"),
+                       ("CLUSTER_DB_PATH", "cluster.sqlite3"), ("FEED_CACHE_PATH", "feed_cache.json"),
+                       ("FEED_STATE_PATH", "feed_state.json"), ("NEAR_DUP_PATH", "near_dups.sqlite3")]:
+    os.environ[name] = os.path.join(_WORKDIR, filename)
+os.environ.update(SUPABASE_URL="http://127.0.0.1:9", SUPABASE_KEY="bench", GEMINI_API_KEY="bench",
+                  CLUSTER_BACKEND="local")
+
+from google.api_core import exceptions as google_exceptions
+
+import scraper
+import analyzer
+import database
+import main
+from rate_limiter import RateLimiter
+
+ITEMS_PER_FEED = 50
+ATOM_NS = "http://www.w3.org/2005/Atom"
+
+# --- FLUX SYNTHÉTIQUES ---
+def _vocabulary(size=3000, seed=7):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+VOCABULARY = _vocabulary()
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+def build_feed(run_id, feed_id, count):
+    """Flux RSS (id pair) ou Atom (id impair) de `count` articles au texte aléatoire"""
+    rng = random.Random(f"{run_id}-{feed_id}")
+    items = []
+    for i in range(count):
+        title, content = _sentence(rng, 8), _sentence(rng, 60)
+        link = f"http://bench/{run_id}/{feed_id}/{i}"
+        if feed_id % 2:
+            items.append(f'<entry><title>{title}</title><link href="{link}"/><summary>{content}</summary></entry>')
+        else:
+            items.append(f"<item><title>{title}</title><link>{link}</link><description>{content}</description></item>")
+    if feed_id % 2:
+        return f'<?xml version="1.0"?><feed xmlns="{ATOM_NS}"><title>Bench</title>{"".join(items)}</feed>'.encode()
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>Bench</title>{"".join(items)}</channel></rss>'.encode()
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """GET /<run>/<feed>/<count>"""
+    def do_GET(self):
+        run_id, feed_id, count = self.path.strip("/").split("/")
+        body = build_feed(run_id, int(feed_id), int(count))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def feeds_for(base, run_id, size):
+    feeds = []
+    for feed_id in range(math.ceil(size / ITEMS_PER_FEED)):
+        count = min(ITEMS_PER_FEED, size - feed_id * ITEMS_PER_FEED)
+        feeds.append({"url": f"{base}/{run_id}/{feed_id}/{count}", "provider": "AWS", "max_items": count,
+                      "interval": 60, "min_interval": 30, "max_interval": 360, "priority": 0})
+    return feeds
+
+# --- MODÈLE FACTICE ---
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModel:
+    """Répond aux prompts d'analyse (unitaires et par lot) après `latency` secondes"""
+
+    def __init__(self, latency=0.05, error_rate=0.0, quota_rate=0.0, seed=1):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.quota_rate = quota_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _analysis(title):
+        return {"title": title, "summary": "Résumé synthétique.", "provider": "AWS", "service": "Bench",
+                "category": "ETL", "impact_level": 2, "impact_analysis": "Aucun."}
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        time.sleep(self.latency)
+        with self._lock:
+            draw = self._rng.random()
+        if draw < self.quota_rate:
+            raise google_exceptions.ResourceExhausted("429 quota simulé")
+        if draw < self.quota_rate + self.error_rate:
+            return FakeResponse("réponse invalide")
+        lines = [line.strip() for line in prompt.splitlines()]
+        links = [l[len("Lien: "):] for l in lines if l.startswith("Lien: ")]
+        titles = [l[len("Titre: "):] for l in lines if l.startswith("Titre: ")]
+        if links:
+            return FakeResponse(json.dumps([dict(self._analysis(t), link=l) for l, t in zip(links, titles)]))
+        return FakeResponse(json.dumps(self._analysis(titles[0] if titles else "?")))
+
+# --- STOCKAGE EN MÉMOIRE ---
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+class _Query:
+    """Sous-ensemble de l'API PostgREST utilisé par database.py"""
+
+    def __init__(self, store, table):
+        self.store, self.table = store, table
+        self.mode, self.payload, self.columns = "select", None, "*"
+        self.filters, self.orders = [], []
+        self.bounds, self.max_rows = None, None
+        self.on_conflict, self.ignore_duplicates = None, False
+
+    def select(self, columns="*", **kwargs):
+        self.columns = columns
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def or_(self, filters):
+        """Disjonction de conditions simples "colonne.eq.valeur" / "colonne.is.null" """
+        values = {"null": None, "true": True, "false": False}
+        conditions = []
+        for condition in filters.split(","):
+            column, op, value = condition.split(".", 2)
+            if op not in ("eq", "is"):
+                raise NotImplementedError(condition)
+            conditions.append((column, values.get(value, value)))
+        self.filters.append(lambda r: any(r.get(c) == v if v is not None else r.get(c) is None
+                                          for c, v in conditions))
+        return self
+
+    def is_(self, column, value):
+        value = None if value == "null" else value
+        self.filters.append(lambda r: r.get(column) is value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def limit(self, n):
+        self.max_rows = n
+        return self
+
+    def insert(self, rows):
+        self.mode, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False, **kwargs):
+        self.mode, self.payload = "upsert", rows
+        self.on_conflict, self.ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def update(self, values):
+        self.mode, self.payload = "update", values
+        return self
+
+    def execute(self):
+        start = time.perf_counter()
+        try:
+            return self._execute()
+        finally:
+            if self.mode in ("insert", "upsert"):
+                self.store.timings["db_write"].append(time.perf_counter() - start)
+
+    def _execute(self):
+        with self.store.lock:
+            rows = self.store.tables[self.table]
+            by_link = self.store.by_link[self.table]
+            if self.mode in ("insert", "upsert"):
+                payload = self.payload if isinstance(self.payload, list) else [self.payload]
+                written = []
+                for row in payload:
+                    existing = by_link.get(row.get("link"))
+                    if existing is not None and self.mode == "upsert":
+                        if not self.ignore_duplicates:
+                            existing.update(row)
+                            written.append(dict(existing))
+                        continue
+                    row = dict(row, id=str(len(rows) + 1))
+                    rows.append(row)
+                    by_link[row.get("link")] = row
+                    written.append(dict(row))
+                return _Result(written)
+            selected = [r for r in rows if all(f(r) for f in self.filters)]
+            if self.mode == "update":
+                for row in selected:
+                    row.update(self.payload)
+                return _Result([dict(r) for r in selected])
+            for column, desc in reversed(self.orders):
+                selected.sort(key=lambda r: (r.get(column) is None, r.get(column) or ""), reverse=desc)
+            if self.bounds:
+                selected = selected[self.bounds[0]:self.bounds[1] + 1]
+            if self.max_rows is not None:
+                selected = selected[:self.max_rows]
+            if self.columns != "*":
+                columns = [c.strip() for c in self.columns.split(",")]
+                selected = [{c: r.get(c) for c in columns} for r in selected]
+            return _Result([dict(r) for r in selected])
+
+class MemoryStore:
+    """Remplaçant du client Supabase : tables en mémoire indexées par lien"""
+
+    def __init__(self, timings):
+        self.tables = defaultdict(list)
+        self.by_link = defaultdict(dict)
+        self.lock = threading.Lock()
+        self.timings = timings
+
+    def table(self, name):
+        return _Query(self, name)
+
+# --- MESURES PAR ÉTAPE ---
+def timed(timings, stage, func):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[stage].append(time.perf_counter() - start)
+    return wrapper
+
+def timed_async(timings, stage, func):
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            timings[stage].append(time.perf_counter() - start)
+    return wrapper
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+STAGES = ["fetch_feed", "parse", "dedup_links", "near_dup", "analyze_batch", "model_call", "db_write"]
+
+def run(size, server_base, model, run_id, trace_memory=False):
+    timings = defaultdict(list)
+    store = MemoryStore(timings)
+    database.set_client(store)
+    model_call = timed(timings, "model_call", model.generate_content)
+    analyzer.set_model(type("TimedModel", (), {"generate_content": staticmethod(model_call)})())
+
+    originals = (scraper._fetch_feed, scraper.parse_xml_feed, database.filter_new_links,
+                 analyzer.analyze_batch_with_rate_limit)
+    scraper._fetch_feed = timed_async(timings, "fetch_feed", originals[0])
+    scraper.parse_xml_feed = timed(timings, "parse", originals[1])
+    database.filter_new_links = timed(timings, "dedup_links", originals[2])
+    analyzer.analyze_batch_with_rate_limit = timed(timings, "analyze_batch", originals[3])
+    main.near_dups.check_and_add = timed(timings, "near_dup", main.near_dups.check_and_add)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        main.run_scan_process_sync(feeds=feeds_for(server_base, run_id, size), trigger="bench")
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = None
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        (scraper._fetch_feed, scraper.parse_xml_feed, database.filter_new_links,
+         analyzer.analyze_batch_with_rate_limit) = originals
+        del main.near_dups.check_and_add  # retour à la méthode de la classe
+
+    stored = len(store.tables["news"])
+    return {"size": size, "elapsed": elapsed, "stored": stored,
+            "peak_mb": peak / 2 ** 20 if peak is not None else None,
+            "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "state": dict(main.SCAN_STATE), "timings": timings}
+
+def _memory(result):
+    if result["peak_mb"] is not None:
+        return f"pic tracemalloc {result['peak_mb']:.1f} Mo"
+    return f"maxrss {result['rss_mb']:.0f} Mo"
+
+def report(result):
+    print(f"\n=== {result['size']} articles ===")
+    print(f"Durée : {result['elapsed']:.2f}s | Débit : {result['stored'] / result['elapsed']:.1f} articles/s "
+          f"| Enregistrés : {result['stored']} | Erreurs d'écriture : {result['state'].get('write_errors')} "
+          f"| Mémoire : {_memory(result)}")
+    print(f"{'étape':<14} {'appels':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total s':>9}")
+    for stage in STAGES:
+        values = result["timings"].get(stage)
+        if not values:
+            continue
+        print(f"{stage:<14} {len(values):>7} {percentile(values, 0.5) * 1000:>9.2f} "
+              f"{percentile(values, 0.95) * 1000:>9.2f} {percentile(values, 0.99) * 1000:>9.2f} {sum(values):>9.2f}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--latency", type=float, default=0.05, help="latence du modèle factice (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part de réponses invalides")
+    parser.add_argument("--quota-rate", type=float, default=0.0, help="part de 429")
+    parser.add_argument("--workers", type=int, default=analyzer.GEMINI_WORKERS)
+    parser.add_argument("--tracemalloc", action="store_true", help="pic d'allocations par scan (plus lent)")
+    args = parser.parse_args()
+
+    # Quota illimité : on mesure le pipeline, pas le limiteur (les 429 déclenchent quand même une pause courte)
+    analyzer.limiter = RateLimiter(rpm=1e6, tpm=1e9, base_backoff=0.1, max_backoff=1)
+    analyzer.GEMINI_WORKERS = args.workers
+    # Tous les flux sont servis par le même hôte local
+    scraper.MAX_PER_HOST = 16
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    model = FakeModel(latency=args.latency, error_rate=args.error_rate, quota_rate=args.quota_rate)
+
+    print(f"Modèle factice : latence {args.latency * 1000:.0f} ms, {args.error_rate:.0%} invalides, "
+          f"{args.quota_rate:.0%} de 429 | {args.workers} workers | état dans {_WORKDIR}")
+    results = []
+    try:
+        for run_id, size in enumerate(args.sizes):
+            results.append(run(size, base, model, f"r{run_id}", trace_memory=args.tracemalloc))
+            report(results[-1])
+    finally:
+        server.shutdown()
+
+    print(f"\n{'articles':>9} {'durée s':>9} {'art/s':>9}  mémoire")
+    for r in results:
+        print(f"{r['size']:>9} {r['elapsed']:>9.2f} {r['stored'] / r['elapsed']:>9.1f}  {_memory(r)}")
+
+if __name__ == "__main__":
+    main_cli()
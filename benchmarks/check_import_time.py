@@ -0,0 +1,91 @@
+"""Contrôle du temps de démarrage : échoue (code 1) si le budget est dépassé.
+
+Usage : python benchmarks/check_import_time.py [--budget 1.0] [--runs 3]
+
+Dans un interpréteur neuf, sans clés Supabase ni Gemini, pour chaque backend de cluster
+(CLUSTER_BACKEND=local et supabase) :
+  - `import main` doit réussir et tenir dans le budget ;
+  - les SDK lourds (google.generativeai, supabase) ne doivent pas être importés ;
+  - /health doit répondre, démarrage de l'application (lifespan) compris, dans le budget ;
+  - /news doit répondre 200 (liste vide) plutôt qu'une erreur, comme les autres lectures.
+Le meilleur des `--runs` essais est retenu pour limiter le bruit de la machine.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules qui ne doivent être chargés qu'au premier appel au modèle ou à la base
+DEFERRED_MODULES = ["google.generativeai", "supabase"]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    status = client.get("/health").status_code
+    ready = time.perf_counter() - start
+    news_status = client.get("/news").status_code
+print(json.dumps({"import": imported, "ready": ready, "status": status, "news_status": news_status,
+                  "loaded": [m for m in %r if m in sys.modules]}))
+""" % (DEFERRED_MODULES,)
+
+# Backends de coordination à vérifier (voir cluster.py)
+CLUSTER_BACKENDS = ["local", "supabase"]
+
+def probe(workdir, backend):
+    env = dict(os.environ)
+    # Clés vides (load_dotenv ne remplace pas une variable déjà définie) et état dans un dossier temporaire
+    env.update(SUPABASE_URL="", SUPABASE_KEY="", GEMINI_API_KEY="", CLUSTER_BACKEND=backend)
+    for name, filename in [("SCAN_JOBS_PATH", "scan_jobs.sqlite3"), ("ANALYSIS_CACHE_PATH", "analysis_cache.sqlite3"),
+                           ("CLUSTER_DB_PATH", "cluster.sqlite3"), ("FEED_CACHE_PATH", "feed_cache.json"),
+                           ("FEED_STATE_PATH", "feed_state.json"), ("NEAR_DUP_PATH", "near_dups.sqlite3")]:
+        env[name] = os.path.join(workdir, filename)
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        print(out.stderr)
+        raise SystemExit(f"❌ Sonde en échec avec CLUSTER_BACKEND={backend} (code {out.returncode})")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=float(os.environ.get("IMPORT_BUDGET", 1.0)),
+                        help="secondes (import et /health)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    failures = []
+    for backend in CLUSTER_BACKENDS:
+        results = []
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as workdir:
+                results.append(probe(workdir, backend))
+        best_import = min(r["import"] for r in results)
+        best_ready = min(r["ready"] for r in results)
+        loaded = sorted({m for r in results for m in r["loaded"]})
+
+        print(f"[{backend}] import main : {best_import * 1000:.0f} ms | /health prêt : {best_ready * 1000:.0f} ms "
+              f"| budget : {args.budget * 1000:.0f} ms")
+        if best_import > args.budget:
+            failures.append(f"[{backend}] import main hors budget")
+        if best_ready > args.budget:
+            failures.append(f"[{backend}] /health hors budget")
+        if any(r["status"] != 200 for r in results):
+            failures.append(f"[{backend}] /health ne répond pas 200")
+        if any(r["news_status"] != 200 for r in results):
+            failures.append(f"[{backend}] /news sans clés ne répond pas 200")
+        if loaded:
+            failures.append(f"[{backend}] SDK importés au démarrage : {', '.join(loaded)}")
+    if failures:
+        print("❌ " + " ; ".join(failures))
+        sys.exit(1)
+    print("✅ Démarrage dans le budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Contrôle de fumée des routes : échoue (code 1) si une route ne répond pas comme attendu.
+
+Usage : python benchmarks/check_routes.py
+
+Chaque route de l'API est appelée une fois avec TestClient, démarrage (lifespan) compris,
+contre les doublures de bench_scan.py (stockage en mémoire, modèle factice) : aucune
+clé, aucun réseau. /scan-events ne se termine jamais : ses premiers événements sont lus
+directement sur la réponse, le client étant déclaré parti juste après.
+"""
+import sys
+import json
+import asyncio
+
+from bench_scan import MemoryStore, FakeResponse, FakeModel
+
+import scraper
+import analyzer
+import database
+import database_async
+import main
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+class AsyncQuery:
+    """Requête du client async : mêmes méthodes, `execute` attendu"""
+
+    def __init__(self, query):
+        self._query = query
+
+    def __getattr__(self, name):
+        method = getattr(self._query, name)
+
+        def chain(*args, **kwargs):
+            method(*args, **kwargs)
+            return self
+        return chain
+
+    async def execute(self):
+        return self._query.execute()
+
+class MissingRpc(Exception):
+    pass
+
+class RouteStore(MemoryStore):
+    """Stockage en mémoire sans fonction SQL de bascule (repli par mise à jour conditionnelle)"""
+
+    unavailable = False
+
+    def table(self, name):
+        if self.unavailable:
+            raise TimeoutError("base injoignable (simulée)")
+        return super().table(name)
+
+    def rpc(self, name, params):
+        raise MissingRpc(f"PGRST202 Could not find the function {name}")
+
+class AsyncRouteStore:
+    def __init__(self, store):
+        self.store = store
+        self.postgrest = self  # fermé par database_async.close() à l'arrêt
+
+    async def aclose(self):
+        pass
+
+    def table(self, name):
+        return AsyncQuery(self.store.table(name))
+
+    def rpc(self, name, params):
+        return self.store.rpc(name, params)
+
+class ChatModel(FakeModel):
+    """Modèle factice qui répond aussi au conseiller, d'un bloc ou morceau par morceau"""
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        if "Titre: " in prompt:
+            return super().generate_content(prompt, generation_config, stream)
+        if stream:
+            return iter([FakeResponse("Réponse "), FakeResponse("du conseiller.")])
+        return FakeResponse("Réponse du conseiller.")
+
+def first_scan_events(since=None):
+    """Événements envoyés par /scan-events à la connexion, le client se déconnectant aussitôt après"""
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def read():
+        scope = {"type": "http", "method": "GET", "path": "/scan-events", "headers": [], "query_string": b""}
+        response = await main.scan_events_stream(Request(scope, receive), since=since)
+        chunks = [chunk async for chunk in response.body_iterator]
+        return response, chunks
+
+    return asyncio.run(read())
+
+def main_cli():
+    store = RouteStore({"db_write": []})
+    store.tables["news"].append({"id": "1", "link": "http://check/1", "title": "EC2 C7g", "summary": "Résumé.",
+                                 "provider": "AWS", "service": "EC2", "category": "Compute", "impact_level": 2,
+                                 "is_saved": False, "created_at": "2026-01-01T00:00:00+00:00"})
+    # Ligne antérieure à la colonne is_saved (NULL) : la bascule doit la sauvegarder
+    store.tables["news"].append({"id": "2", "link": "http://check/2", "title": "RDS PostgreSQL", "summary": "",
+                                 "provider": "AWS", "is_saved": None, "created_at": "2025-12-01T00:00:00+00:00"})
+    database.set_client(store)
+    database_async._client = AsyncRouteStore(store)
+    analyzer.set_model(ChatModel(latency=0))
+    # Scan déclenché sans flux à lire
+    scraper.fetch_rss_data = lambda feeds, is_known=None: []
+
+    failures = []
+
+    def check(label, ok):
+        print(f"{'✅' if ok else '❌'} {label}")
+        if not ok:
+            failures.append(label)
+
+    with TestClient(main.app) as client:
+        for path in ["/health", "/metrics", "/metrics/traces", "/news", "/news?view=list&provider=AWS",
+                     "/news/1", "/stats", "/scan-status"]:
+            check(f"GET {path}", client.get(path).status_code == 200)
+        # is_saved NULL (news du seed) compte comme non sauvegardée
+        check("GET /news?is_saved=false", len(client.get("/news?is_saved=false").json()) == 2)
+        check("GET /news/inconnu -> 404", client.get("/news/inconnu").status_code == 404)
+
+        # Panne ponctuelle : page vide sans ETag, puis les vraies news dès le retour de la base
+        store.unavailable = True
+        degraded = client.get("/news?limit=5")
+        store.unavailable = False
+        check("GET /news (base injoignable) non mise en cache", degraded.json() == []
+              and "etag" not in degraded.headers and len(client.get("/news?limit=5").json()) == 2)
+
+        trigger = client.post("/trigger-scan").json()
+        check("POST /trigger-scan", trigger.get("status") in ("started", "busy"))
+        check("POST /chat", "conseiller" in client.post("/chat", json={"question": "EC2 ?"}).json()["response"])
+        stream = client.post("/chat/stream", json={"question": "Quoi de neuf sur EC2 ?"})
+        check("POST /chat/stream", stream.status_code == 200 and "event: done" in stream.text
+              and stream.headers.get("x-accel-buffering") == "no")
+        check("POST /news/1/toggle-save", client.post("/news/1/toggle-save").json()["is_saved"] is True)
+        check("POST /news/2/toggle-save (NULL)", client.post("/news/2/toggle-save").json()["is_saved"] is True)
+        saved = client.post("/news/saved", json={"ids": ["1"], "is_saved": False}).json()
+        check("POST /news/saved", saved["updated"] == ["1"])
+
+    response, chunks = first_scan_events()
+    state = json.loads(chunks[0].split("data: ", 1)[1]) if chunks else {}
+    check("GET /scan-events", response.headers.get("cache-control") == "no-cache"
+          and chunks[0].startswith("event: state") and "is_scanning" in state and len(chunks) == 1)
+    # Scan déclenché puis terminé avant l'abonnement : `done` doit arriver quand même
+    _, chunks = first_scan_events(since=trigger.get("finished_at") or "")
+    check("GET /scan-events?since= (scan déjà terminé)", any(c.startswith("event: done") for c in chunks))
+
+    if failures:
+        print(f"❌ {len(failures)} route(s) en échec")
+        sys.exit(1)
+    print("✅ Toutes les routes répondent")
+
+if __name__ == "__main__":
+    main_cli()
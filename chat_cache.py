@@ -0,0 +1,76 @@
+import os
+import re
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import retrieval
+import metrics
+
+# Cache mémoire des réponses du conseiller, par question normalisée et contexte envoyé au modèle
+CHAT_CACHE_SIZE = int(os.environ.get("CHAT_CACHE_SIZE", 200))
+CHAT_CACHE_TTL = int(os.environ.get("CHAT_CACHE_TTL", 3600))  # secondes
+
+def question_key(question: str) -> str:
+    """Question sans accents, casse ni ponctuation, tous les mots gardés dans l'ordre.
+
+    Contrairement à `retrieval.tokenize`, aucun mot n'est retiré : "ne ... pas", "avec" /
+    "sans" ou "pourquoi" changent la réponse attendue pour un même contexte.
+    """
+    text = unicodedata.normalize("NFKD", (question or "").lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", text))
+
+def context_fingerprint(context: str) -> str:
+    return hashlib.sha256(context.encode("utf-8")).hexdigest()[:16]
+
+class ChatAnswerCache:
+    """Réponses du chat réutilisées pour une même question (à la casse, aux accents et à la ponctuation près).
+
+    Une réponse n'est servie que pour le même contexte (mêmes news retenues) et tant que
+    l'index de recherche n'a pas changé : un scan qui ajoute des news invalide tout le cache.
+    """
+
+    def __init__(self, max_entries=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (question normalisée, empreinte) -> (réponse, génération, date)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, entry, generation, now):
+        return entry[1] == generation and now - entry[2] <= self.ttl
+
+    def get(self, question: str, context: str):
+        """Réponse en cache pour cette question et ce contexte, ou None"""
+        key = (question_key(question), context_fingerprint(context))
+        generation = retrieval.index.generation
+        now = time.monotonic()
+        with self._lock:
+            # Purge des entrées périmées (TTL dépassé ou news ajoutées depuis)
+            for key in [k for k, e in self._entries.items() if not self._fresh(e, generation, now)]:
+                del self._entries[key]
+
+            if key not in self._entries:
+                self.misses += 1
+                metrics.CACHE_REQUESTS.inc(cache="chat", result="miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.CACHE_REQUESTS.inc(cache="chat", result="hit")
+            return self._entries[key][0]
+
+    def put(self, question: str, context: str, answer: str):
+        key = (question_key(question), context_fingerprint(context))
+        with self._lock:
+            self._entries[key] = (answer, retrieval.index.generation, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
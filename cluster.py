@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+
+# Coordination entre workers / réplicas : baux (leases) à expiration et état de scan partagé.
+# "local"    : fichier SQLite, pour plusieurs workers uvicorn sur la même machine
+# "supabase" : tables Supabase (voir sql/cluster.sql), pour plusieurs réplicas
+CLUSTER_BACKEND = os.environ.get("CLUSTER_BACKEND", "local")
+CLUSTER_DB_PATH = os.environ.get("CLUSTER_DB_PATH", os.path.join(".cache", "cluster.sqlite3"))
+
+# Identifiant unique de ce processus
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+class LocalCluster:
+    def __init__(self, path=CLUSTER_DB_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS scan_state (id INTEGER PRIMARY KEY, version INTEGER NOT NULL, state TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL);
+            """)
+        return self._conn
+
+    def try_lease(self, name: str, ttl: float) -> bool:
+        """Prend ou prolonge le bail `name` ; faux s'il est détenu (et valide) par un autre worker"""
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != WORKER_ID and row[1] > time.time():
+                db.execute("ROLLBACK")
+                return False
+            db.execute("INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                       (name, WORKER_ID, time.time() + ttl))
+            db.execute("COMMIT")
+            return True
+
+    def release(self, name: str):
+        with self._lock:
+            self._db().execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, WORKER_ID))
+
+    def publish_state(self, state: dict):
+        with self._lock:
+            self._db().execute("INSERT OR REPLACE INTO scan_state (id, version, state) VALUES (1, ?, ?)",
+                               (time.time_ns(), json.dumps(state, ensure_ascii=False)))
+
+    def read_state(self):
+        """Retourne (version, état) publié par le dernier worker ayant scanné, ou (None, None)"""
+        with self._lock:
+            row = self._db().execute("SELECT version, state FROM scan_state WHERE id = 1").fetchone()
+        return (row[0], json.loads(row[1])) if row else (None, None)
+
+    def publish_version(self, name: str):
+        """Signale aux autres workers une modification de `name` (nouvelle version partagée)"""
+        with self._lock:
+            self._db().execute("INSERT OR REPLACE INTO versions (name, version) VALUES (?, ?)",
+                               (name, time.time_ns()))
+
+    def read_version(self, name: str):
+        with self._lock:
+            row = self._db().execute("SELECT version FROM versions WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+class SupabaseCluster:
+    @staticmethod
+    def _client():
+        # Import et client tardifs : le backend local ne dépend pas de Supabase,
+        # et le client n'est créé qu'au premier appel (voir `database.get_client`)
+        import database
+        return database.get_client()
+
+    def try_lease(self, name: str, ttl: float) -> bool:
+        try:
+            return bool(self._client().rpc("try_acquire_lease", {
+                "lease_name": name, "holder_id": WORKER_ID, "ttl_seconds": int(ttl)}).execute().data)
+        except Exception as e:
+            print(f"⚠️ Bail {name} indisponible: {e}")
+            return False
+
+    def release(self, name: str):
+        try:
+            self._client().table("cluster_leases").delete().eq("name", name).eq("holder", WORKER_ID).execute()
+        except Exception as e:
+            print(f"⚠️ Libération du bail {name} impossible: {e}")
+
+    def publish_state(self, state: dict):
+        try:
+            self._client().table("scan_state").upsert({"id": 1, "version": time.time_ns(), "state": state}).execute()
+        except Exception as e:
+            print(f"⚠️ Publication de l'état de scan impossible: {e}")
+
+    def read_state(self):
+        try:
+            rows = self._client().table("scan_state").select("version, state").eq("id", 1).execute().data
+            return (rows[0]["version"], rows[0]["state"]) if rows else (None, None)
+        except Exception as e:
+            print(f"⚠️ Lecture de l'état de scan impossible: {e}")
+            return None, None
+
+    def publish_version(self, name: str):
+        try:
+            self._client().table("cluster_versions").upsert({"name": name, "version": time.time_ns()}).execute()
+        except Exception as e:
+            print(f"⚠️ Publication de la version {name} impossible: {e}")
+
+    def read_version(self, name: str):
+        try:
+            rows = self._client().table("cluster_versions").select("version").eq("name", name).execute().data
+            return rows[0]["version"] if rows else None
+        except Exception as e:
+            print(f"⚠️ Lecture de la version {name} impossible: {e}")
+            return None
+
+def get_cluster():
+    return SupabaseCluster() if CLUSTER_BACKEND == "supabase" else LocalCluster()
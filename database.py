@@ -1,78 +1,411 @@
 import os
-from supabase import create_client, Client
+import json
+import time
+import uuid
+import base64
+import threading
 from dotenv import load_dotenv
 from collections import Counter
 from datetime import datetime, timezone
 
+import retrieval
+import metrics
+
 load_dotenv()
 
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
 
-if not url or not key:
-    raise ValueError("⚠️ Clé Supabase manquante")
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Client créé à la première requête : l'import reste rapide et n'échoue pas sans clés"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not url or not key:
+                    raise ValueError("⚠️ Clé Supabase manquante")
+                from supabase import create_client
+                _client = create_client(url, key)
+    return _client
+
+def set_client(client):
+    """Remplace le client Supabase (tests, benchmarks) : tout objet exposant la même API `table()`"""
+    global _client
+    _client = client
+
+# --- VERSION DES DONNÉES ---
+# Incrémentée à chaque écriture : sert d'ETag aux routes de lecture. L'identifiant de
+# démarrage évite qu'un ETag d'un processus précédent soit considéré comme valide.
+# Le compteur est propre au processus : les écritures des autres workers arrivent par
+# la version partagée du cluster (voir main.follow_cluster_state, quelques secondes de retard).
+_BOOT_ID = uuid.uuid4().hex[:8]
+_data_version = 0
+_shared_version = None
+_version_lock = threading.Lock()
+# La version expire aussi après ce délai, pour refléter les écritures hors de l'API (seed, SQL)
+DATA_VERSION_TTL = int(os.environ.get("DATA_VERSION_TTL", 300))
+
+def bump_data_version():
+    global _data_version
+    with _version_lock:
+        _data_version += 1
+
+def local_data_version() -> int:
+    """Nombre d'écritures faites par ce processus (à signaler aux autres workers)"""
+    return _data_version
+
+def set_shared_version(version):
+    """Dernière version publiée par un worker du cluster"""
+    global _shared_version
+    _shared_version = version
+
+def data_version() -> str:
+    return f"{_BOOT_ID}-{_data_version}-{_shared_version}-{int(time.time() // DATA_VERSION_TTL)}"
 
-supabase: Client = create_client(url, key)
+# Ensemble local des liens déjà en base (réchauffé au démarrage, enrichi à chaque insert)
+_known_links = set()
+_links_lock = threading.Lock()
+# Taille des lots pour les requêtes in_ (limite la longueur de l'URL PostgREST)
+LINK_CHUNK_SIZE = 50
+
+def _remember_links(links):
+    with _links_lock:
+        _known_links.update(l for l in links if l)
+
+def is_known_link(link: str) -> bool:
+    """Lien présent dans le cache local (sans requête réseau)"""
+    with _links_lock:
+        return link in _known_links
+
+def warm_link_cache(page_size: int = 1000):
+    """Charge tous les liens existants en mémoire (pagination par plages)"""
+    start = 0
+    try:
+        while True:
+            rows = get_client().table("news").select("link").range(start, start + page_size - 1).execute().data
+            _remember_links(r["link"] for r in rows)
+            if len(rows) < page_size:
+                break
+            start += page_size
+        print(f"🔗 Cache des liens prêt ({len(_known_links)} liens).")
+    except Exception as e:
+        print(f"⚠️ Erreur chargement cache des liens: {e}")
+
+def warm_retrieval_index(page_size: int = 1000):
+    """Reconstruit l'index de recherche du chat à partir de toutes les news"""
+    rows = []
+    start = 0
+    try:
+        while True:
+            page = get_client().table("news").select(retrieval.INDEX_COLUMNS) \
+                .range(start, start + page_size - 1).execute().data
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+            start += page_size
+    except Exception as e:
+        print(f"⚠️ Erreur chargement index de recherche: {e}")
+        return
+    retrieval.index.replace(rows)
+    print(f"🔎 Index de recherche prêt ({len(rows)} news).")
+
+def filter_new_links(links) -> list:
+    """Retourne, dans l'ordre, les liens absents de la base.
+
+    Le cache local élimine les liens connus sans réseau ; le reste est vérifié
+    par lots via une seule requête in_ par lot. Si un lot échoue, ses liens sont
+    écartés (et retentés au prochain scan) plutôt que considérés comme nouveaux.
+    """
+    candidates = []
+    with _links_lock:
+        for link in dict.fromkeys(l for l in links if l):
+            if link not in _known_links:
+                candidates.append(link)
+
+    unresolved = set()
+    for i in range(0, len(candidates), LINK_CHUNK_SIZE):
+        chunk = candidates[i:i + LINK_CHUNK_SIZE]
+        try:
+            with metrics.span("dedup_lookup", links=len(chunk)):
+                rows = get_client().table("news").select("link").in_("link", chunk).execute().data
+            _remember_links(r["link"] for r in rows)
+        except Exception as e:
+            print(f"Erreur vérification des liens: {e}")
+            unresolved.update(chunk)
+
+    with _links_lock:
+        return [l for l in candidates if l not in _known_links and l not in unresolved]
 
 def check_link_exists(link: str) -> bool:
+    with _links_lock:
+        if link in _known_links:
+            return True
     try:
-        res = supabase.table("news").select("id").eq("link", link).execute()
+        res = get_client().table("news").select("id").eq("link", link).execute()
+        if res.data:
+            _remember_links([link])
         return len(res.data) > 0
     except:
         return False
 
+def _prepare_row(data: dict) -> dict:
+    if "created_at" not in data:
+        # IMPORTANT: On enregistre en UTC. 
+        # Le navigateur convertira en heure locale (Algérie) automatiquement.
+        data["created_at"] = datetime.now(timezone.utc).isoformat()
+    data["is_saved"] = False
+    return data
+
 def insert_news(data: dict):
     try:
-        if "created_at" not in data:
-            # IMPORTANT: On enregistre en UTC. 
-            # Le navigateur convertira en heure locale (Algérie) automatiquement.
-            data["created_at"] = datetime.now(timezone.utc).isoformat()
-        
-        data["is_saved"] = False
-        supabase.table("news").insert(data).execute()
+        get_client().table("news").insert(_prepare_row(data)).execute()
+        _remember_links([data.get("link")])
+        _record_inserted([data])
+        bump_data_version()
     except Exception as e:
         print(f"Erreur insert: {e}")
 
-def get_all_news(limit: int = 100):
-    try:
-        return supabase.table("news").select("*").order("created_at", desc=True).limit(limit).execute().data
-    except:
-        return []
+# --- ÉCRITURE PAR LOTS ---
+WRITE_BATCH_SIZE = 20
+WRITE_FLUSH_INTERVAL = 30  # secondes
+WRITE_MAX_RETRIES = 3
+
+class NewsWriter:
+    """Accumule les articles analysés pendant un scan et les écrit par lots.
+
+    Chaque lot est un upsert sur `link` qui ignore les doublons : relancer un scan
+    après un crash ne crée pas de doublon et n'écrase pas les sauvegardes.
+    `on_result(row, status, error)` est appelé pour chaque ligne avec le statut
+    "inserted", "exists" ou "error".
+    """
+
+    def __init__(self, on_result=None, batch_size=WRITE_BATCH_SIZE,
+                 flush_interval=WRITE_FLUSH_INTERVAL, max_retries=WRITE_MAX_RETRIES):
+        self.on_result = on_result
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def add(self, data: dict):
+        with self._lock:
+            self._buffer.append(_prepare_row(data))
+            due = len(self._buffer) >= self.batch_size or \
+                  time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
 
-def toggle_save(item_id: str):
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        if not rows:
+            return
+
+        for attempt in range(self.max_retries):
+            try:
+                with metrics.span("db_write", rows=len(rows)):
+                    res = get_client().table("news").upsert(rows, on_conflict="link", ignore_duplicates=True).execute()
+                self._report(rows, {r.get("link") for r in res.data})
+                return
+            except Exception as e:
+                print(f"Erreur écriture lot ({attempt + 1}/{self.max_retries}): {e}")
+                if attempt + 1 < self.max_retries:
+                    time.sleep(2 ** attempt)
+
+        # Le lot échoue toujours : on isole les lignes fautives une par une
+        for row in rows:
+            try:
+                with metrics.span("db_write", rows=1):
+                    res = get_client().table("news").upsert(row, on_conflict="link", ignore_duplicates=True).execute()
+                self._report([row], {r.get("link") for r in res.data})
+            except Exception as e:
+                self._notify(row, "error", e)
+
+    def _report(self, rows, inserted_links):
+        _remember_links(r.get("link") for r in rows)
+        inserted = [r for r in rows if r.get("link") in inserted_links]
+        if inserted:
+            _record_inserted(inserted)
+            bump_data_version()
+        for row in rows:
+            self._notify(row, "inserted" if row.get("link") in inserted_links else "exists", None)
+
+    def _notify(self, row, status, error):
+        if status == "error":
+            print(f"Erreur insert: {error}")
+        if self.on_result:
+            self.on_result(row, status, error)
+
+# Colonnes utiles aux cartes de la liste (sans l'analyse détaillée)
+LIST_FIELDS = "id, title, summary, provider, service, category, impact_level, link, is_saved, created_at"
+
+def encode_cursor(row: dict) -> str:
+    raw = json.dumps([row["created_at"], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str):
+    """Retourne (created_at, id) ; ValueError si le curseur est invalide"""
     try:
-        current = supabase.table("news").select("is_saved").eq("id", item_id).execute().data
-        if not current: return False
-        
-        new_val = not current[0].get("is_saved", False)
-        supabase.table("news").update({"is_saved": new_val}).eq("id", item_id).execute()
-        return new_val
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), str(item_id)
     except Exception as e:
-        print(f"Erreur toggle save: {e}")
-        return False
+        raise ValueError(f"Curseur invalide: {cursor}") from e
+
+def news_page_query(table, limit: int = 100, cursor: str = None, provider: str = None, category: str = None,
+                    impact_level: int = None, is_saved: bool = None, view: str = "full"):
+    """Construit la requête d'une page de news (exécutée par `database_async.get_news_page`)"""
+    query = table.select(LIST_FIELDS if view == "list" else "*")
+    if provider:
+        query = query.eq("provider", provider)
+    if category:
+        query = query.eq("category", category)
+    if impact_level is not None:
+        query = query.eq("impact_level", impact_level)
+    if is_saved:
+        query = query.eq("is_saved", True)
+    elif is_saved is not None:
+        # Les news antérieures à la colonne (seed) ont is_saved à NULL : non sauvegardées
+        query = query.or_("is_saved.is.null,is_saved.eq.false")
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{item_id}")')
+    return query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1)
+
+def split_page(rows, limit: int):
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+# Fonction SQL de bascule atomique (voir sql/toggle_news_saved.sql)
+TOGGLE_RPC = "toggle_news_saved"
+_toggle_rpc_available = True
+
+def is_missing_rpc_error(e: Exception) -> bool:
+    return "PGRST202" in str(e) or "Could not find the function" in str(e)
+
+def mark_toggle_rpc_missing():
+    global _toggle_rpc_available
+    if _toggle_rpc_available:
+        print(f"⚠️ Fonction {TOGGLE_RPC} absente : bascule par mise à jour conditionnelle")
+    _toggle_rpc_available = False
+
+def toggle_rpc_available() -> bool:
+    return _toggle_rpc_available
+
+# Tentatives de mise à jour conditionnelle avant d'abandonner la bascule
+TOGGLE_ATTEMPTS = 3
 
-def get_stats():
+def toggle_save_steps(table, item_id: str):
+    """Repli sans RPC : mise à jour conditionnée à la valeur lue (pas de mise à jour perdue).
+
+    Générateur exécuté par `database_async.toggle_save` : il produit les requêtes à exécuter
+    sur `table()`, reçoit leurs données et retourne (StopIteration) la valeur enregistrée.
+    Après TOGGLE_ATTEMPTS conflits, la valeur relue en base est retournée telle quelle.
+    """
+    for _ in range(TOGGLE_ATTEMPTS):
+        current = yield table().select("is_saved").eq("id", item_id)
+        if not current:
+            return False
+        old_val = current[0].get("is_saved")
+        query = table().update({"is_saved": not old_val}).eq("id", item_id)
+        # NULL n'est égal à rien en SQL : `eq("is_saved", False)` ne trouverait pas la ligne
+        query = query.is_("is_saved", "null") if old_val is None else query.eq("is_saved", old_val)
+        if (yield query):
+            return not old_val
+    current = yield table().select("is_saved").eq("id", item_id)
+    print(f"⚠️ Bascule de {item_id} abandonnée après {TOGGLE_ATTEMPTS} conflits")
+    return bool(current and current[0].get("is_saved"))
+
+# --- STATISTIQUES (agrégats en mémoire) ---
+# Au-delà de ce délai, les agrégats sont recalculés depuis la base (filet de sécurité)
+STATS_TTL = int(os.environ.get("STATS_TTL", 300))
+STATS_PAGE_SIZE = 1000
+
+_stats = None
+_stats_computed_at = 0.0
+_stats_lock = threading.Lock()
+
+def empty_stats():
+    return {"total": 0, "critical": 0, "providers": Counter(), "categories": Counter(), "timeline": Counter()}
+
+def add_to_stats(stats, rows):
+    for d in rows:
+        stats["total"] += 1
+        if d.get('impact_level') == 3:
+            stats["critical"] += 1
+        stats["providers"][d.get('provider')] += 1
+        stats["categories"][d.get('category', 'Autre')] += 1
+        if d.get('created_at'):
+            stats["timeline"][d['created_at'].split('T')[0]] += 1
+
+STATS_COLUMNS = "provider, impact_level, category, created_at"
+
+def store_stats(stats):
+    """Remplace les agrégats par un recalcul complet"""
+    global _stats, _stats_computed_at
+    with _stats_lock:
+        changed = _stats != stats
+        _stats = stats
+        _stats_computed_at = time.monotonic()
+    # Écritures externes (seed, autre instance) détectées au recalcul
+    if changed:
+        bump_data_version()
+
+def stats_available() -> bool:
+    """Faux tant qu'aucun calcul des agrégats n'a réussi (`format_stats` renvoie alors des zéros)"""
+    return _stats is not None
+
+def stats_expired() -> bool:
+    return _stats is None or time.monotonic() - _stats_computed_at > STATS_TTL
+
+def refresh_stats():
+    """Recalcule les agrégats depuis la table news (appelé après chaque scan et à expiration du TTL)"""
+    stats = empty_stats()
+    start = 0
     try:
-        data = supabase.table("news").select("provider, impact_level, category, created_at").execute().data
-        
-        total = len(data)
-        critical = len([d for d in data if d['impact_level'] == 3])
-        providers = Counter([d['provider'] for d in data])
-        active_provider = providers.most_common(1)[0][0] if providers else "N/A"
-        categories = Counter([d.get('category', 'Autre') for d in data])
-        dates = [d['created_at'].split('T')[0] for d in data if d.get('created_at')]
-        timeline = Counter(dates)
+        while True:
+            rows = get_client().table("news").select(STATS_COLUMNS) \
+                .range(start, start + STATS_PAGE_SIZE - 1).execute().data
+            add_to_stats(stats, rows)
+            if len(rows) < STATS_PAGE_SIZE:
+                break
+            start += STATS_PAGE_SIZE
+    except Exception as e:
+        print(f"Erreur calcul stats: {e}")
+        return
+    store_stats(stats)
 
+def _record_inserted(rows):
+    """Mise à jour incrémentale des agrégats et de l'index de recherche pour des lignes nouvellement insérées"""
+    with _stats_lock:
+        if _stats is not None:
+            add_to_stats(_stats, rows)
+    retrieval.index.add(rows)
+
+def format_stats():
+    with _stats_lock:
+        if _stats is None:
+            return {
+                "total_news": 0, "critical_news": 0, "active_provider": "-", 
+                "providers_stats": {}, "categories_stats": {}, "timeline_stats": {}
+            }
+        providers = _stats["providers"]
         return {
-            "total_news": total,
-            "critical_news": critical,
-            "active_provider": active_provider,
+            "total_news": _stats["total"],
+            "critical_news": _stats["critical"],
+            "active_provider": providers.most_common(1)[0][0] if providers else "N/A",
             "providers_stats": dict(providers),
-            "categories_stats": dict(categories),
-            "timeline_stats": dict(timeline)
+            "categories_stats": dict(_stats["categories"]),
+            "timeline_stats": dict(_stats["timeline"])
         }
-    except Exception as e:
-        return {
-            "total_news": 0, "critical_news": 0, "active_provider": "-", 
-            "providers_stats": {}, "categories_stats": {}, "timeline_stats": {}
-        }
\ No newline at end of file
@@ -0,0 +1,125 @@
+import asyncio
+
+import database
+
+# Version asynchrone des lectures/écritures utilisées par les routes FastAPI.
+# Le client async partage un pool de connexions httpx keep-alive : une requête en
+# attente de Supabase ne bloque plus un thread du threadpool de Starlette.
+# Les caches en mémoire (liens, statistiques, version des données) restent ceux de `database`.
+
+_client = None
+_client_lock = asyncio.Lock()
+
+async def get_client():
+    """Client async créé à la première requête (voir `database.get_client`)"""
+    global _client
+    if _client is None:
+        async with _client_lock:
+            if _client is None:
+                if not database.url or not database.key:
+                    raise ValueError("⚠️ Clé Supabase manquante")
+                from supabase import acreate_client
+                _client = await acreate_client(database.url, database.key)
+    return _client
+
+async def close():
+    global _client
+    if _client is not None:
+        await _client.postgrest.aclose()
+        _client = None
+
+async def get_all_news(limit: int = 100):
+    try:
+        client = await get_client()
+        res = await client.table("news").select("*").order("created_at", desc=True).limit(limit).execute()
+        return res.data
+    except Exception:
+        return []
+
+async def get_news_page(limit: int = 100, cursor: str = None, **filters):
+    """Page de news triée par (created_at, id) décroissants, avec filtres côté serveur.
+
+    Retourne (lignes, curseur_suivant) ; le curseur vaut None sur la dernière page,
+    (None, None) si la lecture échoue.
+    """
+    try:
+        client = await get_client()
+        query = database.news_page_query(client.table("news"), limit=limit, cursor=cursor, **filters)
+        rows = (await query.execute()).data
+    except Exception as e:
+        print(f"Erreur lecture news: {e}")
+        return None, None
+    return database.split_page(rows, limit)
+
+async def get_news_item(item_id: str):
+    try:
+        client = await get_client()
+        rows = (await client.table("news").select("*").eq("id", item_id).execute()).data
+        return rows[0] if rows else None
+    except Exception as e:
+        print(f"Erreur lecture news: {e}")
+        return None
+
+async def _toggle_save_conditional(client, item_id: str):
+    """Voir `database.toggle_save_steps`"""
+    steps = database.toggle_save_steps(lambda: client.table("news"), item_id)
+    try:
+        query = next(steps)
+        while True:
+            query = steps.send((await query.execute()).data)
+    except StopIteration as done:
+        return done.value
+
+async def toggle_save(item_id: str):
+    try:
+        client = await get_client()
+        if database.toggle_rpc_available():
+            try:
+                new_val = (await client.rpc(database.TOGGLE_RPC, {"item_id": item_id}).execute()).data
+                database.bump_data_version()
+                return bool(new_val)
+            except Exception as e:
+                if not database.is_missing_rpc_error(e):
+                    raise
+                database.mark_toggle_rpc_missing()
+
+        new_val = await _toggle_save_conditional(client, item_id)
+        database.bump_data_version()
+        return new_val
+    except Exception as e:
+        print(f"Erreur toggle save: {e}")
+        return False
+
+async def set_saved(item_ids, value: bool) -> list:
+    if not item_ids:
+        return []
+    try:
+        client = await get_client()
+        rows = (await client.table("news").update({"is_saved": value}).in_("id", list(item_ids)).execute()).data
+        database.bump_data_version()
+        return [r["id"] for r in rows]
+    except Exception as e:
+        print(f"Erreur set saved: {e}")
+        return []
+
+async def refresh_stats():
+    stats = database.empty_stats()
+    start = 0
+    try:
+        client = await get_client()
+        while True:
+            res = await client.table("news").select(database.STATS_COLUMNS) \
+                .range(start, start + database.STATS_PAGE_SIZE - 1).execute()
+            database.add_to_stats(stats, res.data)
+            if len(res.data) < database.STATS_PAGE_SIZE:
+                break
+            start += database.STATS_PAGE_SIZE
+    except Exception as e:
+        print(f"Erreur calcul stats: {e}")
+        return
+    database.store_stats(stats)
+
+async def get_stats():
+    if database.stats_expired():
+        await refresh_stats()
+    return database.format_stats()
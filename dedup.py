@@ -0,0 +1,217 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+
+# Similarité (Jaccard estimée, 0 à 1) à partir de laquelle deux articles sont considérés comme la même annonce.
+# Les annonces gabarit ("EC2 C7g ..." / "EC2 M7g ...") dépassent 0.8 : leurs identifiants doivent aussi concorder
+# (`identifiers_conflict`).
+NEAR_DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD", "0.5"))
+# Nombre d'articles récents gardés dans l'index (les plus anciens sont évincés)
+NEAR_DUP_INDEX_SIZE = int(os.environ.get("NEAR_DUP_INDEX_SIZE", "2000"))
+# Signatures des articles bruts (titre et contenu scrapés), pour recharger l'index au démarrage
+NEAR_DUP_PATH = os.environ.get("NEAR_DUP_PATH", os.path.join(".cache", "near_dups.sqlite3"))
+
+# MinHash : NUM_PERM permutations, regroupées en BANDS bandes de ROWS lignes pour le LSH
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Shingles de caractères : robustes aux variations de conjugaison et de ponctuation
+SHINGLE_SIZE = 5
+# Début du contenu pris en compte (le reste est souvent du texte générique de blog)
+CONTENT_CHARS = 1000
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Permutations (a * x + b) mod p, déterministes pour que les signatures soient comparables entre processus
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.sha256(f"a{i}".encode()).digest()[:8], "big") % (_PRIME - 1) + 1,
+     int.from_bytes(hashlib.sha256(f"b{i}".encode()).digest()[:8], "big") % _PRIME)
+    for i in range(NUM_PERM)
+]
+
+def _normalize(text) -> str:
+    text = re.sub(r"<[^>]+>", " ", text or "")
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+def article_text(article: dict) -> str:
+    """Titre + début du contenu (ou du résumé pour une news déjà en base)"""
+    body = article.get("content") or article.get("summary") or ""
+    return f"{article.get('title') or ''} {body[:CONTENT_CHARS]}"
+
+def shingles(text: str) -> set:
+    text = _normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+def signature(text: str) -> tuple:
+    """Signature MinHash du texte (NUM_PERM valeurs)"""
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+              for s in shingles(text)]
+    if not hashes:
+        return ()
+    return tuple(min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH for a, b in _PERMUTATIONS)
+
+def similarity(sig_a: tuple, sig_b: tuple) -> float:
+    """Jaccard estimée : part des permutations dont le minimum coïncide"""
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+# Mots de lieu des noms de régions cloud ("Asia Pacific (Mumbai)", "Europe (Paris)", "US East (Ohio)")
+REGION_WORDS = frozenset("""
+    africa america asia europe pacific middle gulf govcloud
+    bahrain batam calgary canada cape chile dallas dammam doha frankfurt hong hyderabad ireland israel jakarta
+    johannesburg kong london madrid malaysia melbourne mexico milan montreal mumbai ohio oregon osaka paris
+    paulo querétaro queretaro riyadh santiago sao seoul singapore spain stockholm sydney taipei taiwan
+    thailand tokyo toronto turin uae virginia warsaw zurich auckland berlin delhi california
+""".split())
+
+def title_identifiers(title) -> frozenset:
+    """Mots d'un titre qui distinguent les annonces d'un même gabarit : versions et types
+    d'instance (mots contenant un chiffre : "16", "c7g", "ec2") et noms de régions"""
+    return frozenset(w for w in _normalize(title).split() if w in REGION_WORDS or any(c.isdigit() for c in w))
+
+def identifiers_conflict(ids_a: frozenset, ids_b: frozenset) -> bool:
+    """Vrai si chaque titre porte un identifiant absent de l'autre ("C7g" / "M7g", "16.4" / "17.2").
+
+    Un titre reformulé ou sans identifiant ("Zero-ETL integration ... now generally
+    available") reste comparable : seule la similarité du texte décide.
+    """
+    return bool(ids_a - ids_b) and bool(ids_b - ids_a)
+
+class NearDuplicateIndex:
+    """Index LSH des articles récents pour repérer une même annonce publiée sous des liens différents.
+
+    Les candidats sont ceux qui partagent au moins une bande de signature ; seuls ceux
+    dont la similarité estimée atteint `threshold`, sans identifiants contradictoires, sont retenus.
+    Avec `path`, les signatures des articles indexés sont conservées dans un fichier SQLite
+    et `load` les recharge : l'index repart du texte brut scrapé, pas des résumés en base.
+    """
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, max_items=NEAR_DUP_INDEX_SIZE, path=None):
+        self.threshold = threshold
+        self.max_items = max_items
+        self.path = path
+        self._items = OrderedDict()  # link -> (signature, titre, identifiants du titre)
+        self._buckets = defaultdict(set)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS signatures (
+                link TEXT PRIMARY KEY, title TEXT, signature TEXT NOT NULL, added REAL NOT NULL)""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_added ON signatures(added)")
+        return self._conn
+
+    def _persist(self, link, sig, title):
+        if self.path is None:
+            return
+        try:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO signatures (link, title, signature, added) VALUES (?, ?, ?, ?)",
+                       (link, title, json.dumps(sig), time.time()))
+            db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Signature de quasi-doublon non enregistrée: {e}")
+
+    def load(self) -> int:
+        """Recharge les `max_items` signatures les plus récentes et purge les plus anciennes"""
+        if self.path is None:
+            return 0
+        try:
+            with self._lock:
+                db = self._db()
+                rows = db.execute("SELECT link, title, signature FROM signatures ORDER BY added DESC LIMIT ?",
+                                  (self.max_items,)).fetchall()
+                db.execute("""DELETE FROM signatures WHERE link NOT IN (
+                    SELECT link FROM signatures ORDER BY added DESC LIMIT ?)""", (self.max_items,))
+                db.commit()
+                # Les plus anciennes d'abord, pour que l'éviction retire bien les plus anciennes
+                for link, title, sig in reversed(rows):
+                    self._add(link, tuple(json.loads(sig)), title)
+        except sqlite3.Error as e:
+            print(f"⚠️ Signatures de quasi-doublons illisibles: {e}")
+        return len(self._items)
+
+    @staticmethod
+    def _bands(sig):
+        return [(i, sig[i * ROWS:(i + 1) * ROWS]) for i in range(BANDS)]
+
+    def _find(self, link, sig, ids):
+        best, best_score = None, 0.0
+        candidates = set()
+        for band in self._bands(sig):
+            candidates |= self._buckets.get(band, set())
+        candidates.discard(link)
+        for other in candidates:
+            other_sig, _, other_ids = self._items[other]
+            score = similarity(sig, other_sig)
+            if score >= self.threshold and score > best_score and not identifiers_conflict(ids, other_ids):
+                best, best_score = other, score
+        return (best, best_score) if best else None
+
+    def _add(self, link, sig, title):
+        if link in self._items:
+            self._items.move_to_end(link)
+            return
+        self._items[link] = (sig, title, title_identifiers(title))
+        for band in self._bands(sig):
+            self._buckets[band].add(link)
+        while len(self._items) > self.max_items:
+            old_link, (old_sig, _, _) = self._items.popitem(last=False)
+            for band in self._bands(old_sig):
+                bucket = self._buckets.get(band)
+                if bucket is not None:
+                    bucket.discard(old_link)
+                    if not bucket:
+                        del self._buckets[band]
+
+    def find(self, article: dict):
+        """(lien, similarité) de l'article indexé le plus proche, ou None.
+
+        Un article n'est jamais son propre doublon : un lien déjà indexé est ignoré.
+        """
+        sig = signature(article_text(article))
+        if not sig:
+            return None
+        with self._lock:
+            return self._find(article.get("link"), sig, title_identifiers(article.get("title")))
+
+    def add(self, article: dict):
+        sig = signature(article_text(article))
+        if sig:
+            with self._lock:
+                self._add(article.get("link"), sig, article.get("title"))
+                self._persist(article.get("link"), sig, article.get("title"))
+
+    def check_and_add(self, article: dict):
+        """Comme `find`, mais indexe l'article s'il est nouveau (un seul calcul de signature)"""
+        sig = signature(article_text(article))
+        if not sig:
+            return None
+        with self._lock:
+            match = self._find(article.get("link"), sig, title_identifiers(article.get("title")))
+            if match is None:
+                self._add(article.get("link"), sig, article.get("title"))
+                self._persist(article.get("link"), sig, article.get("title"))
+            return match
+
+    def title(self, link):
+        with self._lock:
+            item = self._items.get(link)
+            return item[1] if item else None
@@ -0,0 +1,72 @@
+import os
+import json
+import hashlib
+import threading
+
+# Stockage persistant des validateurs HTTP (ETag / Last-Modified) et du hash du contenu par flux
+FEED_CACHE_PATH = os.environ.get("FEED_CACHE_PATH", os.path.join(".cache", "feed_cache.json"))
+
+_lock = threading.Lock()
+_entries = None
+# Validateurs reçus pendant le scan en cours, appliqués seulement s'il se termine
+_pending = {}
+
+def _load():
+    global _entries
+    if _entries is None:
+        try:
+            with open(FEED_CACHE_PATH, encoding="utf-8") as f:
+                _entries = json.load(f)
+        except (OSError, ValueError):
+            _entries = {}
+    return _entries
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+def conditional_headers(url: str) -> dict:
+    """En-têtes If-None-Match / If-Modified-Since pour ce flux"""
+    with _lock:
+        entry = _load().get(url, {})
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def is_unchanged(url: str, body_hash: str) -> bool:
+    """Vrai si le serveur a renvoyé exactement le même contenu (validateurs ignorés)"""
+    with _lock:
+        return _load().get(url, {}).get("hash") == body_hash
+
+def stage(url: str, etag=None, last_modified=None, body_hash=None):
+    with _lock:
+        _pending[url] = {"etag": etag, "last_modified": last_modified, "hash": body_hash}
+
+def commit(exclude=()):
+    """Enregistre les validateurs du scan terminé sur disque.
+
+    Les flux de `exclude` (articles non traités) sont oubliés, comme par `discard`.
+    """
+    with _lock:
+        for url in exclude:
+            _pending.pop(url, None)
+        if not _pending:
+            return
+        entries = _load()
+        entries.update(_pending)
+        _pending.clear()
+        try:
+            os.makedirs(os.path.dirname(FEED_CACHE_PATH) or ".", exist_ok=True)
+            tmp_path = FEED_CACHE_PATH + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, FEED_CACHE_PATH)
+        except OSError as e:
+            print(f"⚠️ Cache des flux non sauvegardé: {e}")
+
+def discard():
+    """Oublie les validateurs d'un scan interrompu : ses flux seront relus au prochain passage"""
+    with _lock:
+        _pending.clear()
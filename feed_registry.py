@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import threading
+
+import scraper
+
+# Registre des flux : intervalle de relève, nombre max d'articles et priorité par flux
+FEEDS_CONFIG_PATH = os.environ.get("FEEDS_CONFIG_PATH", "feeds.json")
+# État de relève par flux (intervalle courant, prochaine échéance), propre à ce serveur
+FEED_STATE_PATH = os.environ.get("FEED_STATE_PATH", os.path.join(".cache", "feed_state.json"))
+
+# Intervalles en minutes ; 6 h correspond à l'ancien scan global
+DEFAULT_INTERVAL = 360
+DEFAULT_MIN_INTERVAL = 30
+DEFAULT_MAX_INTERVAL = 1440
+# Fréquence à laquelle le scheduler cherche les flux arrivés à échéance
+FEED_TICK_MINUTES = int(os.environ.get("FEED_TICK_MINUTES", "15"))
+# Facteur appliqué à l'intervalle d'un flux sans nouveauté (et inverse quand il déborde)
+BACKOFF_FACTOR = 2
+
+_lock = threading.Lock()
+_state = None
+
+def _normalize(entry: dict) -> dict:
+    interval = int(entry.get("interval_minutes", DEFAULT_INTERVAL))
+    min_interval = int(entry.get("min_interval_minutes", min(interval, DEFAULT_MIN_INTERVAL)))
+    max_interval = int(entry.get("max_interval_minutes", max(interval, DEFAULT_MAX_INTERVAL)))
+    return {
+        "url": entry["url"],
+        "provider": entry["provider"],
+        "interval": interval,
+        "min_interval": min_interval,
+        "max_interval": max_interval,
+        "max_items": int(entry.get("max_items", scraper.MAX_ITEMS_PER_FEED)),
+        "priority": int(entry.get("priority", 0)),
+    }
+
+def load_feeds() -> list:
+    """Flux déclarés dans FEEDS_CONFIG_PATH (scraper.RSS_FEEDS si le fichier est absent), par priorité décroissante"""
+    try:
+        with open(FEEDS_CONFIG_PATH, encoding="utf-8") as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        entries = scraper.RSS_FEEDS
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Registre des flux illisible ({e}), flux par défaut utilisés.")
+        entries = scraper.RSS_FEEDS
+    feeds = [_normalize(entry) for entry in entries]
+    return sorted(feeds, key=lambda feed: -feed["priority"])
+
+def _load_state():
+    global _state
+    if _state is None:
+        try:
+            with open(FEED_STATE_PATH, encoding="utf-8") as f:
+                _state = json.load(f)
+        except (OSError, ValueError):
+            _state = {}
+    return _state
+
+def _save_state():
+    try:
+        os.makedirs(os.path.dirname(FEED_STATE_PATH) or ".", exist_ok=True)
+        tmp_path = FEED_STATE_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_state, f, indent=2)
+        os.replace(tmp_path, FEED_STATE_PATH)
+    except OSError as e:
+        print(f"⚠️ État des flux non sauvegardé: {e}")
+
+def due_feeds(now=None) -> list:
+    """Flux dont la prochaine relève est échue (un flux jamais relevé l'est d'office)"""
+    now = time.time() if now is None else now
+    with _lock:
+        state = _load_state()
+        return [feed for feed in load_feeds() if state.get(feed["url"], {}).get("next_due", 0) <= now]
+
+def record_poll(feeds, new_counts: dict, now=None):
+    """Adapte l'intervalle de chaque flux relevé selon le nombre de nouveaux articles trouvés.
+
+    Un flux qui atteint son plafond d'articles publie plus vite qu'il n'est relevé :
+    son intervalle diminue. Un flux sans nouveauté est relevé de moins en moins souvent.
+    """
+    now = time.time() if now is None else now
+    with _lock:
+        state = _load_state()
+        for feed in feeds:
+            entry = state.setdefault(feed["url"], {})
+            interval = entry.get("interval", feed["interval"])
+            new_items = new_counts.get(feed["url"], 0)
+            if new_items >= feed["max_items"]:
+                interval /= BACKOFF_FACTOR
+            elif new_items == 0:
+                interval *= BACKOFF_FACTOR
+            if new_items:
+                entry["last_new"] = now
+            interval = min(max(interval, feed["min_interval"]), feed["max_interval"])
+            entry.update(interval=interval, last_polled=now, next_due=now + interval * 60)
+        _save_state()
@@ -0,0 +1,63 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from fastapi import Request, Response
+
+import metrics
+
+# Le client garde sa copie mais doit la revalider (ETag) à chaque requête
+CACHE_CONTROL = "no-cache"
+# Réponse de repli (base injoignable) : ni gardée ici, ni par le client
+DEGRADED_CACHE_CONTROL = "no-store"
+
+class ResponseCache:
+    """Cache des réponses JSON des routes de lecture, indexé par (route, paramètres).
+
+    Chaque réponse porte un ETag dérivé de la version des données : tant que la
+    version ne change pas, un client qui renvoie If-None-Match reçoit un 304 sans
+    accès à la base, et les autres reçoivent le corps déjà sérialisé. Une réponse
+    de repli (lecture en échec) n'est jamais mise en cache ni associée à un ETag.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(request: Request) -> str:
+        return f"{request.url.path}?{'&'.join(sorted(str(request.query_params).split('&')))}"
+
+    async def respond(self, request: Request, version: str, build) -> Response:
+        """`await build()` retourne (données, en-têtes, complet) et n'est appelé que si le cache est périmé.
+
+        `complet` est faux quand les données sont un repli après une erreur de lecture.
+        """
+        key = self._key(request)
+        etag = f'W/"{hashlib.sha1(f"{version}|{key}".encode()).hexdigest()[:20]}"'
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+        if etag in request.headers.get("if-none-match", ""):
+            metrics.CACHE_REQUESTS.inc(cache="response", result="not_modified")
+            return Response(status_code=304, headers=headers)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == etag:
+                self._entries.move_to_end(key)
+        metrics.CACHE_REQUESTS.inc(cache="response", result="hit" if entry is not None and entry[0] == etag else "miss")
+        if entry is None or entry[0] != etag:
+            data, extra_headers, complete = await build()
+            body = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+            if not complete:
+                return Response(content=body, media_type="application/json",
+                                headers={**(extra_headers or {}), "Cache-Control": DEGRADED_CACHE_CONTROL})
+            entry = (etag, body, extra_headers or {})
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return Response(content=entry[1], media_type="application/json", headers={**entry[2], **headers})
@@ -1,16 +1,37 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.background import BackgroundScheduler
+import os
 import datetime
 import time
 import asyncio
+import json
+import hashlib
+import functools
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import scraper
 import analyzer
 import database
+import database_async
+import feed_cache
+import feed_registry
+import dedup
+import retrieval
+import metrics
+from chat_cache import ChatAnswerCache
+from scan_events import ScanBroadcaster
+from http_cache import ResponseCache
+import scan_jobs
+from cluster import get_cluster
 
 # --- ÉTAT GLOBAL ---
 SCAN_STATE = {
@@ -19,22 +40,125 @@ SCAN_STATE = {
     "message": "Prêt",
     "total_found": 0,
     "new_added": 0,
-    "last_execution": None
+    "write_errors": 0,
+    "last_execution": None,
+    # Fin du dernier scan, réussi ou non : change à chaque scan, même trop court pour être vu en cours
+    "finished_at": None
 }
 
+scan_events = ScanBroadcaster()
+
+# --- COORDINATION MULTI-WORKERS ---
+# Baux partagés (leader du scheduler, scan en cours) et état de scan commun à tous les workers
+cluster = get_cluster()
+# Durée des baux, renouvelés toutes les LEASE_TTL / 3 secondes tant que le worker est vivant
+LEASE_TTL = 60
+# Intervalle de recopie de l'état publié par le worker qui scanne
+CLUSTER_POLL = 2
+is_leader = False
+# Positionné pendant qu'un scan tourne dans ce processus
+local_scan = threading.Event()
+# Sérialise les déclenchements de ce processus (clics, scheduler) jusqu'à `local_scan`
+_acquire_lock = threading.Lock()
+
+def _apply_scan_state(changes: dict, share: bool):
+    changed = {k: v for k, v in changes.items() if SCAN_STATE.get(k) != v}
+    if changed:
+        SCAN_STATE.update(changed)
+        if share:
+            cluster.publish_state(SCAN_STATE)
+        scan_events.publish(SCAN_STATE)
+
+def update_scan_state(**changes):
+    """Modifie SCAN_STATE, le publie pour les autres workers et le pousse aux abonnés de /scan-events"""
+    _apply_scan_state(changes, share=True)
+
+def sync_data_version(published: int) -> int:
+    """Signale les écritures de ce worker et adopte la version partagée des données.
+
+    Une news sauvegardée sur un worker invalide ainsi les réponses en cache (/news, /stats)
+    de tous les autres. Retourne le compteur d'écritures locales publié.
+    """
+    writes = database.local_data_version()
+    if writes != published:
+        cluster.publish_version("data")
+    database.set_shared_version(cluster.read_version("data"))
+    return writes
+
+async def follow_cluster_state():
+    """Recopie l'état publié par le worker qui scanne : tous les workers répondent la même chose"""
+    last_version = None
+    published = 0
+    while True:
+        await asyncio.sleep(CLUSTER_POLL)
+        try:
+            published = await run_in_threadpool(sync_data_version, published)
+        except Exception as e:
+            print(f"⚠️ Synchronisation de la version des données impossible: {e}")
+        if local_scan.is_set():
+            continue
+        try:
+            version, state = await run_in_threadpool(cluster.read_state)
+        except Exception as e:
+            print(f"⚠️ Lecture de l'état partagé impossible: {e}")
+            continue
+        if version is not None and version != last_version:
+            # Scan terminé sur un autre worker avec de nouvelles news : l'index de recherche local est à refaire
+            if last_version is not None and state.get("new_added") \
+                    and state.get("last_execution") != SCAN_STATE.get("last_execution"):
+                threading.Thread(target=database.warm_retrieval_index, daemon=True).start()
+            last_version = version
+            _apply_scan_state(state, share=False)
+
+def renew_leases():
+    global is_leader
+    leader = cluster.try_lease("scheduler", LEASE_TTL)
+    if leader and not is_leader:
+        print("👑 Ce worker pilote le scan périodique.")
+    is_leader = leader
+    if local_scan.is_set():
+        cluster.try_lease("scan", LEASE_TTL)
+
 scheduler = BackgroundScheduler()
 
+# Index des annonces récentes : une même annonce publiée sous un autre lien n'est analysée qu'une fois
+near_dups = dedup.NearDuplicateIndex(path=dedup.NEAR_DUP_PATH)
+
+def warm_near_duplicates():
+    # Signatures du texte brut des articles déjà vus (les résumés en base sont réécrits par l'IA)
+    print(f"🧬 Index des quasi-doublons prêt ({near_dups.load()} articles).")
+
 def scheduled_scan():
-    print("⏰ Scan automatique déclenché...")
-    run_scan_process_sync()
+    # Chaque worker a son scheduler, mais seul le leader relève les flux arrivés à échéance
+    if not is_leader:
+        return
+    feeds = feed_registry.due_feeds()
+    if not feeds:
+        return
+    print(f"⏰ Scan automatique déclenché ({len(feeds)} flux à relever)...")
+    run_scan_process_sync(trigger="scheduled", feeds=feeds)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Scan toutes les 6 heures
-    scheduler.add_job(scheduled_scan, 'interval', hours=6)
+    # Élection du leader, puis renouvellement régulier des baux
+    await run_in_threadpool(renew_leases)
+    scheduler.add_job(renew_leases, 'interval', seconds=LEASE_TTL // 3)
+    # Chaque flux a son propre intervalle (feeds.json) : on vérifie régulièrement lesquels sont échus
+    scheduler.add_job(scheduled_scan, 'interval', minutes=feed_registry.FEED_TICK_MINUTES)
     scheduler.start()
+    follower = asyncio.create_task(follow_cluster_state())
+    # Préchargement des liens connus sans retarder le démarrage de l'API
+    threading.Thread(target=database.warm_link_cache, daemon=True).start()
+    threading.Thread(target=warm_near_duplicates, daemon=True).start()
+    threading.Thread(target=database.warm_retrieval_index, daemon=True).start()
+    # Reprise d'un scan interrompu par l'arrêt précédent (crash, reload)
+    if jobs.has_interrupted():
+        threading.Thread(target=run_scan_process_sync, kwargs={"trigger": "resume"}, daemon=True).start()
     yield
+    follower.cancel()
     scheduler.shutdown()
+    cluster.release("scheduler")
+    await database_async.close()
 
 app = FastAPI(title="Cloud Watcher Pro", lifespan=lifespan)
 
@@ -44,102 +168,411 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+# Compression des réponses JSON (les flux SSE sont exclus par Starlette)
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    """Histogramme des durées par route (modèle de chemin, pas l'URL : cardinalité bornée).
+
+    Pour un flux SSE, la durée mesurée s'arrête à l'envoi des en-têtes.
+    """
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                                     route=route.path if route else "unmatched", status=status)
+
+response_cache = ResponseCache()
+
+# Budget de tokens du contexte envoyé au conseiller
+CHAT_CONTEXT_TOKENS = int(os.environ.get("CHAT_CONTEXT_TOKENS", 1500))
+
+# Réponses déjà générées pour une même question sur le même contexte
+chat_answers = ChatAnswerCache()
 
 class ChatRequest(BaseModel):
     question: str
+    # Nombre max de news retenues pour le contexte (les plus pertinentes pour la question)
     context_limit: int = 20
 
+class SetSavedRequest(BaseModel):
+    ids: List[str]
+    is_saved: bool
+
 # --- LOGIQUE SCAN ---
-def run_scan_process_sync():
-    global SCAN_STATE
-    SCAN_STATE["is_scanning"] = True
-    SCAN_STATE["progress"] = 5
-    SCAN_STATE["message"] = "Connexion aux flux..."
-    SCAN_STATE["new_added"] = 0
+# File persistante des scans : verrou single-flight et reprise après interruption
+jobs = scan_jobs.ScanJobStore()
+
+def on_write_result(job_id, row, status, error):
+    metrics.SCAN_ARTICLES.inc(outcome=status)
+    if status in ("inserted", "exists"):
+        jobs.set_stage(job_id, [row.get("link")], scan_jobs.STORED)
+    if status == "inserted":
+        update_scan_state(new_added=SCAN_STATE["new_added"] + 1)
+    elif status == "error":
+        update_scan_state(write_errors=SCAN_STATE["write_errors"] + 1)
+
+def acquire_scan(trigger: str):
+    """Bail "scan" du cluster puis verrou de la file locale ; (None, False) si un scan tourne déjà.
+
+    `try_lease` réussit aussi quand ce worker détient déjà le bail : un scan en cours
+    dans ce processus est donc vérifié d'abord, sans quoi l'échec de `jobs.acquire`
+    libérerait le bail du scan en cours.
+    """
+    with _acquire_lock:
+        if local_scan.is_set():
+            return None, False
+        if not cluster.try_lease("scan", LEASE_TTL):
+            return None, False
+        job_id, resumed = jobs.acquire(trigger)
+        if job_id is None:
+            # Aucun scan dans ce processus : le bail vient d'être pris par cet appel
+            cluster.release("scan")
+            return None, False
+        local_scan.set()
+        return job_id, resumed
+
+def run_scan_process_sync(job_id=None, resumed=False, trigger="manual", feeds=None):
+    """Scan par étapes (récupération, dédoublonnage, analyse, enregistrement).
+
+    L'étape de chaque article est persistée dans `jobs` : un scan interrompu est
+    repris sans nouveau scraping ni nouvelle analyse des articles déjà traités.
+    `feeds` limite le scan à certains flux du registre (tous par défaut).
+    """
+    if job_id is None:
+        job_id, resumed = acquire_scan(trigger)
+        if job_id is None:
+            print("⏳ Scan déjà en cours, déclenchement ignoré.")
+            return
+
+    update_scan_state(is_scanning=True, progress=5, new_added=0, write_errors=0,
+                      message="Reprise du scan interrompu..." if resumed else "Connexion aux flux...")
+    status = "failed"
+    # Flux relevés par ce scan, dont l'intervalle sera ajusté après dédoublonnage
+    polled = None
     
     try:
-        raw_articles = scraper.fetch_rss_data()
-        total = len(raw_articles)
-        SCAN_STATE["total_found"] = total
-        SCAN_STATE["progress"] = 10
+        # 1. Récupération des flux (inutile si le scan repris a déjà ses articles)
+        if not (resumed and jobs.count(job_id)):
+            polled = feeds if feeds is not None else feed_registry.load_feeds()
+            articles = scraper.fetch_rss_data(polled, is_known=database.is_known_link)
+            metrics.SCAN_ARTICLES.inc(len(articles), outcome="fetched")
+            jobs.add_articles(job_id, articles)
+        total = jobs.count(job_id)
+        update_scan_state(total_found=total, progress=10)
+        jobs.heartbeat(job_id)
         
         if total == 0:
-            SCAN_STATE["is_scanning"] = False
-            SCAN_STATE["last_execution"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            if polled:
+                feed_registry.record_poll(polled, {})
+            feed_cache.commit()
+            update_scan_state(last_execution=datetime.datetime.now(datetime.timezone.utc).isoformat())
+            status = "done"
             return
 
-        step_value = 80 / total if total > 0 else 0
-        
-        for i, article in enumerate(raw_articles):
-            SCAN_STATE["message"] = f"Traitement ({i+1}/{total}): {article.get('title')[:15]}..."
-            
-            # Vérification si l'article existe déjà
-            if not database.check_link_exists(article.get("link")):
-                
-                # --- PAUSE ANTI-QUOTA (CRITIQUE) ---
-                # On attend 10 secondes entre chaque appel IA pour respecter le plan gratuit
-                time.sleep(10) 
+        # 2. Vérification groupée des articles déjà en base (1 requête par lot au lieu d'1 par article)
+        fetched = jobs.articles(job_id, scan_jobs.FETCHED)
+        if fetched:
+            update_scan_state(message="Vérification des doublons...")
+            new_links = set(database.filter_new_links([a.get("link") for a in fetched]))
+            # Contenu déjà analysé (autre flux, lien modifié, base vidée) : aucun appel IA
+            cached = {}
+            # Liens dont la vérification a échoué : ni connus ni nouveaux, retentés au prochain scan
+            unresolved = []
+            for article in fetched:
+                if article.get("link") not in new_links:
+                    if not database.is_known_link(article.get("link")):
+                        unresolved.append(article.get("link"))
+                        metrics.SCAN_ARTICLES.inc(outcome="unresolved")
+                        continue
+                    print(f"   -> Déjà en base : {article.get('title')[:20]}...")
+                    metrics.SCAN_ARTICLES.inc(outcome="known")
+                    continue
+                # Même annonce sous un autre lien (autre flux, autre fournisseur) : ni analyse ni insertion
+                with metrics.span("near_dup"):
+                    match = near_dups.check_and_add(article)
+                if match is not None:
+                    print(f"   -> Quasi-doublon ({match[1]:.0%}) ignoré : {article['link']} "
+                          f"reprend {match[0]} ({(near_dups.title(match[0]) or '')[:40]})")
+                    metrics.SCAN_ARTICLES.inc(outcome="near_duplicate")
+                    new_links.discard(article["link"])
+                    continue
+                analysis = analyzer.cached_analysis(article)
+                if analysis is not None:
+                    metrics.SCAN_ARTICLES.inc(outcome="cached_analysis")
+                    cached[article["link"]] = analysis
+            jobs.set_stage(job_id, unresolved, scan_jobs.FAILED)
+            jobs.set_stage(job_id, [a["link"] for a in fetched if a["link"] not in new_links
+                                    and a["link"] not in unresolved], scan_jobs.SKIPPED)
+            jobs.set_stage(job_id, [l for l in new_links if l not in cached], scan_jobs.DEDUPED)
+            jobs.set_stage(job_id, list(cached), scan_jobs.ANALYZED, analyses=cached)
+            if polled:
+                feed_registry.record_poll(polled, Counter(a.get("feed") for a in fetched if a["link"] in new_links))
+
+        to_analyze = jobs.articles(job_id, scan_jobs.DEDUPED)
+        update_scan_state(progress=15)
+        step_value = 80 / len(to_analyze) if to_analyze else 0
+
+        # 3. Analyse IA par lots en parallèle, cadencée par le limiteur de quota (GEMINI_RPM / GEMINI_TPM).
+        # 4. Les analyses sont écrites par lots ; le buffer est vidé même si le scan échoue
+        with database.NewsWriter(on_result=functools.partial(on_write_result, job_id)) as writer, \
+             ThreadPoolExecutor(max_workers=analyzer.GEMINI_WORKERS) as pool:
+            # Plusieurs articles par requête : une seule copie des consignes et moins d'appels
+            size = max(1, analyzer.GEMINI_BATCH_SIZE)
+            batches = [to_analyze[i:i + size] for i in range(0, len(to_analyze), size)]
+            futures = {pool.submit(analyzer.analyze_batch_with_rate_limit, b): b for b in batches}
+            # Analyses obtenues avant l'appel IA (cache) ou avant l'interruption du scan
+            for analyzed in jobs.analyses(job_id):
+                writer.add(analyzed)
+            done = 0
+            for future in as_completed(futures):
+                batch = futures[future]
+                results = {a["link"]: r for a, r in zip(batch, future.result()) if r}
+                jobs.set_stage(job_id, list(results), scan_jobs.ANALYZED, analyses=results)
+                jobs.set_stage(job_id, [a["link"] for a in batch if a["link"] not in results], scan_jobs.FAILED)
+                metrics.SCAN_ARTICLES.inc(len(results), outcome="analyzed")
+                metrics.SCAN_ARTICLES.inc(len(batch) - len(results), outcome="analysis_failed")
+                jobs.heartbeat(job_id)
+                for analyzed in results.values():
+                    writer.add(analyzed)
+                done += len(batch)
+                update_scan_state(message=f"Traitement ({done}/{len(to_analyze)})...",
+                                  progress=15 + int(done * step_value))
                 
-                analyzed = analyzer.analyze_article_with_ai(article)
-                if analyzed:
-                    database.insert_news(analyzed)
-                    SCAN_STATE["new_added"] += 1
-            else:
-                print(f"   -> Déjà en base : {article.get('title')[:20]}...")
-            
-            SCAN_STATE["progress"] = 10 + int((i + 1) * step_value)
-            
-        SCAN_STATE["progress"] = 100
-        SCAN_STATE["message"] = "Terminé !"
+            update_scan_state(message="Enregistrement...")
+
+        cache_stats = analyzer.cache.stats()
+        print(f"🗃️ Cache d'analyses : {cache_stats['hits']} hits, {cache_stats['misses']} miss, {cache_stats['size']} entrées")
+
+        # Recalage des statistiques sur la base (les inserts les ont déjà mises à jour)
+        database.refresh_stats()
+
+        # Un flux n'est marqué comme lu que si tous ses articles sont en base ou écartés :
+        # sinon (analyse ou écriture en échec, vérification impossible) il sera relu en entier
+        feed_cache.commit(exclude=jobs.unfinished_feeds(job_id))
         # Enregistrement de l'heure en UTC (le frontend convertira en heure d'Algérie)
-        SCAN_STATE["last_execution"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        update_scan_state(progress=100, message="Terminé !",
+                          last_execution=datetime.datetime.now(datetime.timezone.utc).isoformat())
+        status = "done"
         
     except Exception as e:
         print(f"Erreur Scan: {e}")
-        SCAN_STATE["message"] = "Erreur technique"
+        feed_cache.discard()
+        update_scan_state(message="Erreur technique")
     finally:
+        metrics.SCANS.inc(status=status)
+        jobs.finish(job_id, status)
         time.sleep(1) 
-        SCAN_STATE["is_scanning"] = False
-
-def run_scan_wrapper():
-    # Exécution synchrone dans un thread séparé géré par FastAPI
-    run_scan_process_sync()
+        update_scan_state(is_scanning=False,
+                          finished_at=datetime.datetime.now(datetime.timezone.utc).isoformat())
+        cluster.release("scan")
+        local_scan.clear()
 
 # --- ROUTES ---
+@app.get("/health")
+async def health():
+    """Sonde de disponibilité : ne touche ni à la base ni au modèle (créés à leur premier usage)"""
+    return {"status": "ok", "scanning": SCAN_STATE["is_scanning"]}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Métriques de ce worker au format Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/metrics/traces")
+async def get_traces(limit: int = Query(100, ge=1, le=metrics.TRACE_BUFFER_SIZE)):
+    """Derniers spans (étapes chronométrées) de ce worker, du plus récent au plus ancien"""
+    return metrics.recent_spans(limit)
+
 @app.get("/news")
-def get_news():
-    return database.get_all_news(limit=100)
+async def get_news(request: Request,
+             limit: int = Query(100, ge=1, le=500),
+             cursor: Optional[str] = None,
+             provider: Optional[str] = None,
+             category: Optional[str] = None,
+             impact_level: Optional[int] = Query(None, ge=1, le=3),
+             is_saved: Optional[bool] = None,
+             view: str = Query("full", pattern="^(full|list)$")):
+    """Liste paginée par curseur ; la page suivante est indiquée dans l'en-tête X-Next-Cursor"""
+    if cursor:
+        try:
+            database.decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def build():
+        rows, next_cursor = await database_async.get_news_page(limit=limit, cursor=cursor, provider=provider,
+                                                   category=category, impact_level=impact_level,
+                                                   is_saved=is_saved, view=view)
+        if rows is None:
+            # Base injoignable : page vide, sans cache pour ne pas la resservir jusqu'à la prochaine version
+            return [], {}, False
+        return rows, {"X-Next-Cursor": next_cursor} if next_cursor else {}, True
+
+    return await response_cache.respond(request, database.data_version(), build)
+
+@app.get("/news/{item_id}")
+async def get_news_item(item_id: str):
+    item = await database_async.get_news_item(item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="News introuvable")
+    return item
 
 @app.get("/stats")
-def get_stats_route():
-    return database.get_stats()
+async def get_stats_route(request: Request):
+    async def build():
+        stats = await database_async.get_stats()
+        return stats, None, database.stats_available()
+    return await response_cache.respond(request, database.data_version(), build)
 
 @app.get("/scan-status")
-def get_scan_status():
-    return SCAN_STATE
+async def get_scan_status(request: Request):
+    state = dict(SCAN_STATE)
+
+    async def build():
+        return state, None, True
+    # ETag tiré du contenu : identique sur tous les workers qui recopient le même état, et après un redémarrage
+    version = hashlib.sha1(json.dumps(state, sort_keys=True, default=str).encode()).hexdigest()
+    return await response_cache.respond(request, f"scan-{version}", build)
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# Délai entre deux commentaires keep-alive sur les connexions SSE inactives
+SSE_KEEPALIVE = 15
+# En-têtes des flux SSE : pas de cache, pas de mise en tampon par un proxy (nginx)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def scan_done_event(state: dict) -> str:
+    return sse_event({"new_data": state.get("new_added", 0) > 0,
+                      "new_added": state.get("new_added", 0),
+                      "last_execution": state.get("last_execution")}, event="done")
+
+@app.get("/scan-events")
+async def scan_events_stream(request: Request, since: Optional[str] = None):
+    """Progression du scan poussée en SSE : état complet à la connexion, puis uniquement les changements.
+
+    `done` est envoyé quand un scan se termine, y compris s'il a commencé et fini entre deux
+    recopies de l'état partagé (`finished_at` change). `since` est le `finished_at` connu du
+    client au déclenchement : un scan déjà terminé avant l'abonnement est signalé aussitôt.
+    """
+    queue = scan_events.subscribe()
+
+    async def events():
+        last = dict(SCAN_STATE)
+        try:
+            yield sse_event(last, event="state")
+            if since is not None and not last.get("is_scanning") and (last.get("finished_at") or "") != since:
+                yield scan_done_event(last)
+            while not await request.is_disconnected():
+                try:
+                    state = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                diff = {k: v for k, v in state.items() if last.get(k) != v}
+                if diff:
+                    yield sse_event(diff, event="progress")
+                if (last.get("is_scanning") and not state.get("is_scanning")) \
+                        or state.get("finished_at") != last.get("finished_at"):
+                    yield scan_done_event(state)
+                last = state
+        finally:
+            scan_events.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 @app.post("/trigger-scan")
 async def trigger_scan(background_tasks: BackgroundTasks):
-    if SCAN_STATE["is_scanning"]:
-        return {"status": "busy", "message": "Déjà en cours"}
+    # Prise du verrou atomique avant de répondre : deux clics ne lancent pas deux scans
+    # Fin du scan précédent : le client la passe à /scan-events?since= pour reconnaître la fin du sien
+    finished_at = SCAN_STATE.get("finished_at")
+    job_id, resumed = await run_in_threadpool(acquire_scan, "manual")
+    if job_id is None:
+        return {"status": "busy", "message": "Déjà en cours", "finished_at": finished_at}
     
-    # Lancement en arrière-plan
-    background_tasks.add_task(run_scan_wrapper)
-    return {"status": "started", "message": "Démarré"}
+    # Lancement en arrière-plan (exécution synchrone dans le threadpool)
+    background_tasks.add_task(run_scan_process_sync, job_id, resumed)
+    return {"status": "started", "message": "Démarré", "finished_at": finished_at}
 
-@app.post("/chat")
-def chat_with_advisor(req: ChatRequest):
-    recent_news = database.get_all_news(limit=req.context_limit)
+async def build_chat_context(question: str, context_limit: int) -> str:
+    """News les plus pertinentes pour la question (index BM25 local, sans requête en base)"""
+    if len(retrieval.index):
+        return retrieval.index.build_context(question, k=context_limit, token_budget=CHAT_CONTEXT_TOKENS)
+    # Index pas encore chargé (démarrage) : dernières news
+    recent_news = await database_async.get_all_news(limit=context_limit)
     context_text = "Actu Cloud :\n"
     for n in recent_news:
-        context_text += f"- {n['title']} (Impact: {n['impact_level']})\n"
-    response = analyzer.ask_gemini_strategy(req.question, context_text)
-    return {"response": response}
+        context_text += retrieval.context_line(n) + "\n"
+    return context_text
+
+@app.post("/chat")
+async def chat_with_advisor(req: ChatRequest):
+    context_text = await build_chat_context(req.question, req.context_limit)
+    cached = chat_answers.get(req.question, context_text)
+    if cached is not None:
+        return {"response": cached, "cached": True}
+    # Le SDK Gemini reste synchrone : l'appel modèle part dans le threadpool
+    response = await run_in_threadpool(analyzer.ask_gemini_strategy, req.question, context_text)
+    if not response.startswith(analyzer.UNAVAILABLE_MESSAGE):
+        chat_answers.put(req.question, context_text, response)
+    return {"response": response, "cached": False}
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """Réponse du conseiller en Server-Sent Events, morceau par morceau"""
+    context_text = await build_chat_context(req.question, req.context_limit)
+    cached = chat_answers.get(req.question, context_text)
+    if cached is not None:
+        async def replay():
+            yield sse_event({"delta": cached})
+            yield sse_event({"cached": True}, event="done")
+        return StreamingResponse(replay(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    chunks = analyzer.stream_gemini_strategy(req.question, context_text)
+    end = object()
+
+    async def events():
+        parts = []
+        try:
+            while not await request.is_disconnected():
+                # Le SDK Gemini est synchrone : chaque morceau est lu dans le threadpool
+                chunk = await run_in_threadpool(next, chunks, end)
+                if chunk is end:
+                    # Réponse complète et sans erreur : réutilisable pour la même question
+                    if parts and not any(p.startswith(analyzer.UNAVAILABLE_MESSAGE) for p in parts):
+                        chat_answers.put(req.question, context_text, "".join(parts))
+                    yield sse_event({}, event="done")
+                    break
+                parts.append(chunk)
+                yield sse_event({"delta": chunk})
+        finally:
+            # Client parti : on arrête de consommer (et de payer) la génération
+            try:
+                chunks.close()
+            except ValueError:
+                pass
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 @app.post("/news/{item_id}/toggle-save")
-def toggle_save_route(item_id: str):
-    return {"status": "success", "is_saved": database.toggle_save(item_id)}
+async def toggle_save_route(item_id: str):
+    return {"status": "success", "is_saved": await database_async.toggle_save(item_id)}
+
+@app.post("/news/saved")
+async def set_saved_route(req: SetSavedRequest):
+    """Sauvegarde (ou retire) plusieurs news en une seule requête"""
+    updated = await database_async.set_saved(req.ids, req.is_saved)
+    return {"status": "success", "is_saved": req.is_saved, "updated": updated}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,150 @@
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+# Métriques du processus au format texte Prometheus (chaque worker expose les siennes)
+# Bornes des histogrammes de durée, en secondes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Nombre de spans récents conservés pour /metrics/traces
+TRACE_BUFFER_SIZE = int(os.environ.get("TRACE_BUFFER_SIZE", 500))
+# Affiche chaque span terminé dans les logs
+TRACE_LOG = os.environ.get("TRACE_LOG", "0") == "1"
+
+_registry = []
+_registry_lock = threading.Lock()
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels attendus {self.labelnames}, reçus {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(dict(zip(self.labelnames, key)), value))
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_value(self, labels, value):
+        return [f"{self.name}_total{_format_labels(labels)} {value}"]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ((0,) * len(self.buckets), 0.0, 0))
+            counts = tuple(n + (value <= bound) for n, bound in zip(counts, self.buckets))
+            self._values[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            return self._values.get(self._key(labels), (None, 0.0, 0))[2]
+
+    def _render_value(self, labels, value):
+        counts, total, count = value
+        lines = [f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {n}"
+                 for bound, n in zip(self.buckets, counts)]
+        lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+def render() -> str:
+    """Toutes les métriques du processus, au format d'exposition texte Prometheus"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- MÉTRIQUES DE L'APPLICATION ---
+STAGE_SECONDS = Histogram("techwatch_stage_seconds", "Durée des étapes du scan (récupération, parsing, dédoublonnage, appel IA, écriture)",
+                          ["stage"])
+HTTP_SECONDS = Histogram("techwatch_http_request_seconds", "Durée des requêtes HTTP par route",
+                         ["method", "route", "status"])
+AI_PARSE_FAILURES = Counter("techwatch_ai_parse_failures", "Réponses du modèle inexploitables", ["kind"])
+QUOTA_ERRORS = Counter("techwatch_quota_errors", "Requêtes refusées par le modèle pour dépassement de quota (429)")
+CACHE_REQUESTS = Counter("techwatch_cache_requests", "Consultations des caches", ["cache", "result"])
+SCAN_ARTICLES = Counter("techwatch_scan_articles", "Articles traités par les scans, par issue", ["outcome"])
+FEED_ERRORS = Counter("techwatch_feed_errors", "Flux non récupérés", ["reason"])
+SCANS = Counter("techwatch_scans", "Scans terminés, par statut", ["status"])
+
+# --- SPANS ---
+_recent_spans = deque(maxlen=TRACE_BUFFER_SIZE)
+_current_span = contextvars.ContextVar("current_span", default=None)
+_span_ids = iter(range(1, 1 << 62))
+_span_ids_lock = threading.Lock()
+
+@contextmanager
+def span(stage: str, **attributes):
+    """Chronomètre une étape : histogramme `techwatch_stage_seconds{stage}` et trace récente.
+
+    Les spans imbriqués (même thread ou même tâche asyncio) référencent leur parent.
+    """
+    with _span_ids_lock:
+        span_id = next(_span_ids)
+    parent = _current_span.get()
+    token = _current_span.set(span_id)
+    start_wall, start = time.time(), time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_span.reset(token)
+        STAGE_SECONDS.observe(duration, stage=stage)
+        record = {"id": span_id, "parent": parent, "stage": stage, "start": start_wall,
+                  "duration_ms": round(duration * 1000, 3), "error": error, **attributes}
+        _recent_spans.append(record)
+        if TRACE_LOG:
+            print(f"⏱️ {stage} {record['duration_ms']} ms {attributes or ''}")
+
+def recent_spans(limit: int = 100) -> list:
+    """Derniers spans terminés, du plus récent au plus ancien"""
+    return list(_recent_spans)[-limit:][::-1]
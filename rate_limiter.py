@@ -0,0 +1,73 @@
+import threading
+import time
+
+class TokenBucket:
+    """Seau à jetons : `capacity` jetons max, rechargé de `rate` jetons par seconde"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Secondes à attendre avant de pouvoir retirer `amount` jetons (0 si disponible)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+class RateLimiter:
+    """Limiteur requêtes/minute + tokens/minute partagé par les workers d'analyse.
+
+    En cas d'erreur de quota (429), `backoff()` suspend tous les workers pendant une
+    durée croissante et réduit le débit ; `success()` le remonte progressivement
+    jusqu'à la limite configurée.
+    """
+
+    def __init__(self, rpm: float, tpm: float, max_backoff: float = 120, base_backoff: float = 5):
+        self.max_rpm = rpm
+        self.requests = TokenBucket(capacity=max(1.0, rpm / 60 * 10), rate=rpm / 60)
+        self.tokens = TokenBucket(capacity=tpm, rate=tpm / 60)
+        self.max_backoff = max_backoff
+        self.base_backoff = base_backoff
+        self._penalty = 0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0):
+        """Bloque jusqu'à ce qu'une requête de `tokens` tokens soit autorisée"""
+        while True:
+            with self._lock:
+                wait = max(self._paused_until - time.monotonic(),
+                           self.requests.wait_time(1),
+                           self.tokens.wait_time(tokens))
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return
+            time.sleep(min(wait, 1.0))
+
+    def backoff(self):
+        """Quota dépassé : pause exponentielle et débit divisé par deux"""
+        with self._lock:
+            self._penalty += 1
+            delay = min(self.max_backoff, self.base_backoff * 2 ** (self._penalty - 1))
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self.requests.rate = max(self.requests.rate / 2, 1 / 60)
+            print(f"🐢 Quota atteint : pause de {delay}s, débit réduit à {self.requests.rate * 60:.1f} req/min")
+
+    def success(self):
+        """Requête réussie : on remonte le débit de 10% vers la limite configurée"""
+        with self._lock:
+            self._penalty = max(0, self._penalty - 1)
+            self.requests.rate = min(self.max_rpm / 60, self.requests.rate * 1.1)
@@ -0,0 +1,139 @@
+import re
+import math
+import heapq
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+# Paramètres BM25 classiques
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Le titre compte double : il résume l'annonce mieux que le corps du résumé
+TITLE_WEIGHT = 2
+# Colonnes chargées en mémoire pour l'index et le contexte du chat
+INDEX_COLUMNS = "link,title,summary,service,provider,impact_level,created_at"
+# Longueur max du résumé recopié dans le contexte
+CONTEXT_SUMMARY_CHARS = 240
+
+_STOPWORDS = {
+    "le", "la", "les", "un", "une", "des", "de", "du", "et", "ou", "en", "au", "aux", "a", "pour",
+    "par", "sur", "dans", "avec", "sans", "que", "qui", "quoi", "quel", "quelle", "quels", "quelles",
+    "est", "sont", "ce", "ces", "cette", "se", "sa", "son", "ses", "il", "elle", "ils", "on", "nous",
+    "vous", "je", "ne", "pas", "plus", "l", "d", "qu", "s", "y", "comment", "faut", "dois", "doit", "chez",
+    "the", "of", "and", "to", "in", "for", "on", "with", "is", "are", "what", "how", "new",
+}
+
+def tokenize(text) -> list:
+    """Mots en minuscules, sans accents ni mots vides"""
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in re.findall(r"\w+", text) if len(t) > 1 and t not in _STOPWORDS]
+
+def _document_terms(row: dict) -> Counter:
+    terms = Counter(tokenize(row.get("title")) * TITLE_WEIGHT)
+    terms.update(tokenize(row.get("summary")))
+    terms.update(tokenize(row.get("service")))
+    return terms
+
+def estimate_tokens(text: str) -> int:
+    # ~4 caractères par token
+    return len(text) // 4 + 1
+
+def context_line(row: dict) -> str:
+    summary = (row.get("summary") or "")[:CONTEXT_SUMMARY_CHARS]
+    line = f"- {row.get('title')} ({row.get('provider')}, {row.get('service') or '-'}, Impact: {row.get('impact_level')})"
+    return f"{line} : {summary}" if summary else line
+
+class RetrievalIndex:
+    """Index BM25 en mémoire des news (titre, résumé, service), mis à jour à chaque insertion.
+
+    Les documents sont identifiés par leur lien ; réindexer un lien remplace l'entrée.
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._rows = {}
+        self._lengths = {}
+        self._postings = defaultdict(dict)  # terme -> {lien: fréquence}
+        self._total_length = 0
+        # Incrémentée à chaque modification : les réponses du chat calculées avant sont périmées
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _remove(self, link):
+        if link not in self._rows:
+            return
+        for term in _document_terms(self._rows.pop(link)):
+            postings = self._postings[term]
+            postings.pop(link, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(link)
+
+    def add(self, rows):
+        with self._lock:
+            for row in rows:
+                link = row.get("link")
+                if not link:
+                    continue
+                self._remove(link)
+                terms = _document_terms(row)
+                self._rows[link] = {k: row.get(k) for k in INDEX_COLUMNS.split(",")}
+                self._lengths[link] = sum(terms.values())
+                self._total_length += self._lengths[link]
+                for term, freq in terms.items():
+                    self._postings[term][link] = freq
+            self.generation += 1
+
+    def replace(self, rows):
+        """Reconstruit l'index à partir de toutes les news (préchargement)"""
+        fresh = RetrievalIndex(self.k1, self.b)
+        fresh.add(rows)
+        with self._lock:
+            self._rows, self._lengths = fresh._rows, fresh._lengths
+            self._postings, self._total_length = fresh._postings, fresh._total_length
+            self.generation += 1
+
+    def search(self, question: str, k: int = 20) -> list:
+        """Les `k` news les plus pertinentes pour la question (les plus récentes en cas d'égalité)"""
+        terms = set(tokenize(question))
+        with self._lock:
+            count = len(self._rows)
+            if not count:
+                return []
+            avg_length = self._total_length / count
+            scores = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for link, freq in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[link] / avg_length)
+                    scores[link] += idf * freq * (self.k1 + 1) / (freq + norm)
+            rows = self._rows
+            if scores:
+                ranked = heapq.nlargest(k, scores, key=lambda link: (scores[link], rows[link].get("created_at") or ""))
+            else:
+                # Question sans terme connu : les dernières news restent le meilleur contexte
+                ranked = heapq.nlargest(k, rows, key=lambda link: rows[link].get("created_at") or "")
+            return [rows[link] for link in ranked]
+
+    def build_context(self, question: str, k: int = 20, token_budget: int = 1500) -> str:
+        """Contexte du chat : les `k` news les plus pertinentes, dans la limite de `token_budget` tokens"""
+        context_text = "Actu Cloud :\n"
+        used = estimate_tokens(context_text)
+        for row in self.search(question, k):
+            line = context_line(row) + "\n"
+            cost = estimate_tokens(line)
+            if used + cost > token_budget:
+                break
+            context_text += line
+            used += cost
+        return context_text
+
+index = RetrievalIndex()
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+class ScanBroadcaster:
+    """Diffuse les changements de SCAN_STATE aux clients abonnés (SSE).
+
+    `publish` est appelé depuis le thread du scan : chaque abonné reçoit une copie
+    de l'état dans sa propre file asyncio, via la boucle qui l'a créée.
+    """
+
+    def __init__(self, max_pending: int = 100):
+        self.max_pending = max_pending
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.max_pending)
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers = {s for s in self._subscribers if s[1] is not queue}
+
+    def publish(self, state: dict):
+        snapshot = dict(state)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, snapshot)
+            except RuntimeError:
+                # Boucle fermée (arrêt du serveur) : abonné obsolète
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, snapshot: dict):
+        # Client trop lent : seul le dernier état compte, on jette le plus ancien
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(snapshot)
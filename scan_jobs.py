@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# File de scans persistante : verrou "un seul scan à la fois" et étape de chaque article,
+# pour reprendre un scan interrompu (crash, redémarrage, reload) là où il s'est arrêté.
+SCAN_JOBS_PATH = os.environ.get("SCAN_JOBS_PATH", os.path.join(".cache", "scan_jobs.sqlite3"))
+# Un scan sans signe de vie depuis ce délai est considéré comme interrompu
+SCAN_STALE_AFTER = int(os.environ.get("SCAN_STALE_AFTER", 900))
+# Nombre de scans terminés conservés dans l'historique
+SCAN_JOBS_KEEP = 20
+
+# Étapes d'un article : fetched -> deduped -> analyzed -> stored (ou skipped / failed)
+FETCHED, DEDUPED, ANALYZED, STORED, SKIPPED, FAILED = "fetched", "deduped", "analyzed", "stored", "skipped", "failed"
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+def _pid_alive(pid: int) -> bool:
+    """Faux si le processus n'existe plus ; vrai dans le doute (le heartbeat tranchera)"""
+    if os.name == "nt":
+        # Sous Windows, os.kill(pid, 0) envoie un Ctrl+C au processus : pas de sonde fiable
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+@contextmanager
+def _transaction(db, begin="BEGIN IMMEDIATE"):
+    """Transaction explicite, annulée sur toute exception : la connexion partagée
+    n'est jamais laissée en cours de transaction (ni le fichier verrouillé)"""
+    db.execute(begin)
+    try:
+        yield db
+    except BaseException:
+        if db.in_transaction:
+            db.execute("ROLLBACK")
+        raise
+    db.execute("COMMIT")
+
+class ScanJobStore:
+    def __init__(self, path=SCAN_JOBS_PATH):
+        self.path = path
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Mode autocommit : les transactions sont explicites (BEGIN IMMEDIATE)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    status TEXT NOT NULL,
+                    trigger TEXT,
+                    owner TEXT,
+                    heartbeat REAL,
+                    started_at TEXT,
+                    finished_at TEXT
+                );
+                -- Verrou single-flight : au plus un job "running"
+                CREATE UNIQUE INDEX IF NOT EXISTS one_running_job ON jobs(status) WHERE status = 'running';
+                CREATE TABLE IF NOT EXISTS job_items (
+                    job_id INTEGER NOT NULL,
+                    link TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    stage TEXT NOT NULL,
+                    article TEXT NOT NULL,
+                    analysis TEXT,
+                    PRIMARY KEY (job_id, link)
+                );
+            """)
+        return self._conn
+
+    def _release_dead_jobs(self, db):
+        """Marque comme interrompus les jobs dont le processus est mort ou muet"""
+        hostname = socket.gethostname()
+        for job_id, owner, heartbeat in db.execute(
+                "SELECT id, owner, heartbeat FROM jobs WHERE status = 'running'").fetchall():
+            host, _, pid = (owner or "").rpartition(":")
+            dead = host == hostname and pid.isdigit() and not _pid_alive(int(pid))
+            if dead or time.time() - (heartbeat or 0) > SCAN_STALE_AFTER:
+                db.execute("UPDATE jobs SET status = 'interrupted' WHERE id = ?", (job_id,))
+
+    def acquire(self, trigger: str):
+        """Prend le verrou de scan. Retourne (job_id, repris) ou (None, False) si un scan tourne déjà.
+
+        S'il existe un scan interrompu, il est repris au lieu d'en créer un nouveau.
+        """
+        with self._lock:
+            try:
+                with _transaction(self._db()) as db:
+                    self._release_dead_jobs(db)
+                    interrupted = db.execute(
+                        "SELECT id FROM jobs WHERE status = 'interrupted' ORDER BY id DESC LIMIT 1").fetchone()
+                    if interrupted:
+                        job_id, resumed = interrupted[0], True
+                        db.execute("UPDATE jobs SET status = 'running', owner = ?, heartbeat = ? WHERE id = ?",
+                                   (self.owner, time.time(), job_id))
+                        # Les autres scans interrompus plus anciens sont abandonnés
+                        db.execute("UPDATE jobs SET status = 'abandoned' WHERE status = 'interrupted'")
+                    else:
+                        cur = db.execute("""INSERT INTO jobs (status, trigger, owner, heartbeat, started_at)
+                                            VALUES ('running', ?, ?, ?, ?)""",
+                                         (trigger, self.owner, time.time(), _now_iso()))
+                        job_id, resumed = cur.lastrowid, False
+                return job_id, resumed
+            except sqlite3.IntegrityError:
+                # Un autre job est déjà "running" (index one_running_job)
+                return None, False
+
+    def has_interrupted(self) -> bool:
+        with self._lock:
+            with _transaction(self._db()) as db:
+                self._release_dead_jobs(db)
+            return db.execute("SELECT 1 FROM jobs WHERE status = 'interrupted'").fetchone() is not None
+
+    def heartbeat(self, job_id: int):
+        with self._lock:
+            self._db().execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time(), job_id))
+
+    def finish(self, job_id: int, status: str = "done"):
+        """Libère le verrou ; status="interrupted" laisse le job reprenable"""
+        with self._lock:
+            db = self._db()
+            db.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?", (status, _now_iso(), job_id))
+            # Purge de l'historique des scans terminés
+            db.execute("""DELETE FROM job_items WHERE job_id IN (
+                SELECT id FROM jobs WHERE status IN ('done', 'failed', 'abandoned') ORDER BY id DESC LIMIT -1 OFFSET ?)""",
+                       (SCAN_JOBS_KEEP,))
+            db.execute("""DELETE FROM jobs WHERE id IN (
+                SELECT id FROM jobs WHERE status IN ('done', 'failed', 'abandoned') ORDER BY id DESC LIMIT -1 OFFSET ?)""",
+                       (SCAN_JOBS_KEEP,))
+
+    def add_articles(self, job_id: int, articles):
+        """Enregistre les articles récupérés (étape fetched) ; un lien en double n'est gardé qu'une fois"""
+        with self._lock, _transaction(self._db(), "BEGIN") as db:
+            for position, article in enumerate(articles):
+                db.execute("""INSERT OR IGNORE INTO job_items (job_id, link, position, stage, article)
+                              VALUES (?, ?, ?, ?, ?)""",
+                           (job_id, article.get("link"), position, FETCHED, json.dumps(article, ensure_ascii=False)))
+
+    def set_stage(self, job_id: int, links, stage: str, analyses=None):
+        """Passe des articles à l'étape `stage` ; `analyses` = {link: analyse} pour l'étape analyzed"""
+        analyses = analyses or {}
+        with self._lock, _transaction(self._db(), "BEGIN") as db:
+            for link in links:
+                if link in analyses:
+                    db.execute("UPDATE job_items SET stage = ?, analysis = ? WHERE job_id = ? AND link = ?",
+                               (stage, json.dumps(analyses[link], ensure_ascii=False), job_id, link))
+                else:
+                    db.execute("UPDATE job_items SET stage = ? WHERE job_id = ? AND link = ?", (stage, job_id, link))
+
+    def articles(self, job_id: int, stage: str):
+        """Articles d'un job à une étape donnée, dans l'ordre des flux"""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT article FROM job_items WHERE job_id = ? AND stage = ? ORDER BY position",
+                (job_id, stage)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def unfinished_feeds(self, job_id: int) -> set:
+        """Flux dont au moins un article n'a été ni enregistré ni écarté"""
+        with self._lock:
+            rows = self._db().execute("SELECT article FROM job_items WHERE job_id = ? AND stage NOT IN (?, ?)",
+                                      (job_id, STORED, SKIPPED)).fetchall()
+        return {json.loads(r[0]).get("feed") for r in rows}
+
+    def analyses(self, job_id: int):
+        """Analyses terminées mais pas encore enregistrées en base"""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT analysis FROM job_items WHERE job_id = ? AND stage = ? ORDER BY position",
+                (job_id, ANALYZED)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def count(self, job_id: int) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM job_items WHERE job_id = ?", (job_id,)).fetchone()[0]
@@ -1,6 +1,13 @@
-import requests
+import io
+import asyncio
+import httpx
 import xml.etree.ElementTree as ET
 import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import feed_cache
+import metrics
 
 # Headers pour simuler un navigateur et éviter les rejets
 HEADERS = {
@@ -15,74 +22,174 @@ RSS_FEEDS = [
     {"url": "https://feeds.feedburner.com/GoogleCloudPlatform", "provider": "GCP"}
 ]
 
-def parse_xml_feed(content, provider):
+# Timeout par flux (30s pour les connexions lentes comme Azure)
+FEED_TIMEOUT = 30
+# Délai global du scraping : un flux trop lent est abandonné, les autres sont conservés
+FETCH_DEADLINE = 45
+# Nombre max de requêtes simultanées vers un même hôte (ex: les 2 flux AWS)
+MAX_PER_HOST = 2
+# Taille du pool de connexions keep-alive partagé
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+# Plafond par défaut des articles lus par flux (surchargé par `max_items` dans feeds.json)
+MAX_ITEMS_PER_FEED = 3
+
+def _parse_item(item, provider):
+    # Titre
+    title = item.findtext("title") or item.findtext(f"{ATOM_NS}title")
+    
+    # Lien
+    link = item.findtext("link")
+    if not link:
+        link_elem = item.find(f"{ATOM_NS}link")
+        if link_elem is None:
+            link_elem = item.find("link")
+        if link_elem is not None:
+            link = link_elem.get("href")
+    
+    # Contenu
+    description = item.findtext("description") or \
+                  item.findtext(f"{ATOM_NS}content") or \
+                  item.findtext(f"{ATOM_NS}summary") or \
+                  "Contenu non disponible"
+
+    if title and link:
+        return {
+            "title": title.strip(),
+            "link": link.strip(),
+            # On tronque à 5000 char pour économiser des tokens IA
+            "content": description[:5000],
+            "raw_provider": provider
+        }
+    return None
+
+def _item_tag(root_tag):
+    """Balise des articles, déduite de l'élément racine (RSS <item>, Atom <entry>)"""
+    if root_tag == f"{ATOM_NS}feed":
+        return f"{ATOM_NS}entry"
+    if root_tag == "feed":
+        return "entry"
+    return "item"
+
+def iter_feed_items(content, provider, limit=None, is_known=None):
+    """Parseur incrémental (iterparse) compatible RSS et Atom.
+
+    Les articles sont produits au fil de la lecture et retirés de l'arbre une fois
+    traités : la mémoire ne dépend pas de la taille du flux. La lecture s'arrête
+    après `limit` articles, ou au premier lien déjà connu (`is_known(link)`), les
+    flux étant classés du plus récent au plus ancien.
+    """
+    item_tag = None
+    parents = []
+    count = 0
+    try:
+        for event, elem in ET.iterparse(io.BytesIO(content), events=("start", "end")):
+            if event == "start":
+                if item_tag is None:
+                    item_tag = _item_tag(elem.tag)
+                parents.append(elem)
+                continue
+
+            parents.pop()
+            if elem.tag != item_tag:
+                continue
+
+            article = _parse_item(elem, provider)
+            # Libère l'article traité (et ses enfants) de l'arbre en construction
+            if parents:
+                parents[-1].remove(elem)
+            if article is None:
+                continue
+            if is_known and is_known(article["link"]):
+                return
+            yield article
+            count += 1
+            if limit and count >= limit:
+                return
+    except ET.ParseError as e:
+        print(f"⚠️ Erreur de parsing XML pour {provider}: {e}")
+        metrics.FEED_ERRORS.inc(reason="xml")
+
+def parse_xml_feed(content, provider, limit=None, is_known=None):
     """Parseur robuste compatible RSS et Atom"""
-    articles = []
+    return list(iter_feed_items(content, provider, limit=limit, is_known=is_known))
+
+async def _fetch_feed(client, source, host_locks, is_known=None):
+    """Télécharge un flux (limité par hôte) et retourne ses articles"""
+    feed_url = source["url"]
+    provider = source["provider"]
+
     try:
-        root = ET.fromstring(content)
-        
-        # 1. Format RSS Standard (<item>)
-        items = root.findall(".//item")
-        if not items:
-            # 2. Format Atom (<entry>) - Gère les namespaces
-            items = root.findall(".//{http://www.w3.org/2005/Atom}entry")
-        if not items:
-            # 3. Fallback sans namespace
-             items = root.findall(".//entry")
-
-        for item in items:
-            # Titre
-            title = item.findtext("title") or item.findtext("{http://www.w3.org/2005/Atom}title")
-            
-            # Lien
-            link = item.findtext("link")
-            if not link:
-                link_elem = item.find("{http://www.w3.org/2005/Atom}link")
-                if link_elem is not None:
-                    link = link_elem.get("href")
-            
-            # Contenu
-            description = item.findtext("description") or \
-                          item.findtext("{http://www.w3.org/2005/Atom}content") or \
-                          item.findtext("{http://www.w3.org/2005/Atom}summary") or \
-                          "Contenu non disponible"
-
-            if title and link:
-                articles.append({
-                    "title": title.strip(),
-                    "link": link.strip(),
-                    # On tronque à 5000 char pour économiser des tokens IA
-                    "content": description[:5000],
-                    "raw_provider": provider
-                })
-                
+        async with host_locks[urlparse(feed_url).netloc]:
+            with metrics.span("fetch", provider=provider):
+                response = await client.get(feed_url, headers=feed_cache.conditional_headers(feed_url))
+
+        if response.status_code == 304:
+            print(f"   -> {provider}: flux inchangé (304).")
+            return []
+
+        if response.status_code == 200:
+            body_hash = feed_cache.content_hash(response.content)
+            feed_cache.stage(feed_url,
+                             etag=response.headers.get("ETag"),
+                             last_modified=response.headers.get("Last-Modified"),
+                             body_hash=body_hash)
+            # Certains serveurs ignorent les validateurs : même contenu, pas de parsing
+            if feed_cache.is_unchanged(feed_url, body_hash):
+                print(f"   -> {provider}: contenu identique, parsing ignoré.")
+                return []
+
+            with metrics.span("parse", provider=provider):
+                items = parse_xml_feed(response.content, provider,
+                                       limit=source.get("max_items", MAX_ITEMS_PER_FEED), is_known=is_known)
+            # Flux d'origine, pour adapter sa fréquence de relève (feed_registry)
+            for item in items:
+                item["feed"] = feed_url
+            print(f"   -> {provider}: {len(items)} articles extraits.")
+            return items
+        print(f"❌ Erreur HTTP {response.status_code} sur {feed_url}")
+        metrics.FEED_ERRORS.inc(reason=f"http_{response.status_code}")
     except Exception as e:
-        print(f"⚠️ Erreur de parsing XML pour {provider}: {e}")
-        
-    return articles
+        print(f"❌ Erreur réseau sur {feed_url}: {e}")
+        metrics.FEED_ERRORS.inc(reason="network")
 
-def fetch_rss_data():
+    return []
+
+async def fetch_rss_data_async(feeds=None, deadline=FETCH_DEADLINE, is_known=None):
+    """Récupère tous les flux en parallèle via un pool de connexions partagé.
+
+    Chaque flux a son propre timeout ; ceux qui ne répondent pas avant `deadline`
+    secondes sont abandonnés sans bloquer les résultats des autres.
+    `is_known(link)` arrête la lecture d'un flux au premier article déjà en base.
+    """
+    feeds = RSS_FEEDS if feeds is None else feeds
+    host_locks = defaultdict(lambda: asyncio.Semaphore(MAX_PER_HOST))
     all_articles = []
-    print("📡 Démarrage du scraping RSS (Mode Direct)...")
-
-    for source in RSS_FEEDS:
-        feed_url = source["url"]
-        provider = source["provider"]
-        
-        try:
-            # Timeout augmenté à 30s pour les connexions lentes (Azure)
-            response = requests.get(feed_url, headers=HEADERS, timeout=30)
-            
-            if response.status_code == 200:
-                items = parse_xml_feed(response.content, provider)
-                # On ne garde que les 3 derniers par flux pour limiter la charge IA
-                items = items[:3]
-                print(f"   -> {provider}: {len(items)} articles extraits.")
-                all_articles.extend(items)
+    print("📡 Démarrage du scraping RSS (Mode Parallèle)...")
+
+    async with httpx.AsyncClient(headers=HEADERS, timeout=FEED_TIMEOUT, limits=POOL_LIMITS,
+                                 follow_redirects=True) as client:
+        tasks = [asyncio.create_task(_fetch_feed(client, source, host_locks, is_known)) for source in feeds]
+        if not tasks:
+            return all_articles
+
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        # On conserve l'ordre de déclaration des flux
+        for source, task in zip(feeds, tasks):
+            if task in done:
+                all_articles.extend(task.result())
             else:
-                print(f"❌ Erreur HTTP {response.status_code} sur {feed_url}")
-                
-        except Exception as e:
-            print(f"❌ Erreur réseau sur {feed_url}: {e}")
+                print(f"⏱️ Délai global dépassé pour {source['url']}")
+                metrics.FEED_ERRORS.inc(reason="deadline")
+
+    return all_articles
 
-    return all_articles
\ No newline at end of file
+def fetch_rss_data(feeds=None, is_known=None):
+    """Point d'entrée synchrone (thread du scan ou du scheduler)"""
+    return asyncio.run(fetch_rss_data_async(feeds, is_known=is_known))
@@ -58,7 +58,8 @@ document.addEventListener('alpine:init', () => {
 
         async fetchData() {
             try {
-                const res = await fetch('https://technology-watch-spa.onrender.com/news');
+                // Vue "liste" : sans l'analyse détaillée, chargée à l'ouverture d'une news
+                const res = await fetch('https://technology-watch-spa.onrender.com/news?view=list');
                 this.news = await res.json();
             } catch (e) { 
                 console.error('Error fetching news:', e); 
@@ -112,7 +113,7 @@ document.addEventListener('alpine:init', () => {
                 const data = await res.json();
                 if(data.status === 'started') {
                     this.isScanning = true;
-                    this.monitorScanProgress();
+                    this.monitorScanProgress(data.finished_at);
                 }
             } catch (e) { 
                 console.error('Error triggering scan:', e); 
@@ -126,7 +127,7 @@ document.addEventListener('alpine:init', () => {
                 const state = await res.json();
                 if(state.is_scanning) {
                     this.isScanning = true;
-                    this.monitorScanProgress();
+                    this.monitorScanProgress(state.finished_at);
                 } else {
                     if(state.last_execution) {
                         const dateScan = new Date(state.last_execution);
@@ -138,7 +139,43 @@ document.addEventListener('alpine:init', () => {
             }
         },
 
-        monitorScanProgress() {
+        monitorScanProgress(since) {
+            if (!window.EventSource) return this.pollScanProgress();
+
+            // Progression poussée par le serveur (SSE) : plus de requête chaque seconde.
+            // `since` = fin du scan précédent : un changement de `finished_at` marque la fin du nôtre
+            const source = new EventSource('https://technology-watch-spa.onrender.com/scan-events?since='
+                                           + encodeURIComponent(since || ''));
+            const current = {}; // état complet : `state` puis différences `progress`
+            let sawScanning = false;
+            let finished = false;
+            const finish = (newData) => {
+                if (finished) return;
+                finished = true;
+                source.close();
+                this.isScanning = false;
+                if (newData) this.hasNewData = true;
+                this.refreshData(); // Refresh auto à la fin
+            };
+            const apply = (e) => {
+                const state = Object.assign(current, JSON.parse(e.data));
+                if (state.progress !== undefined) this.scanProgress = state.progress;
+                if (state.is_scanning === true) sawScanning = true;
+                // Scan vu en cours puis arrêté, ou terminé depuis le déclenchement : fin sans attendre `done`
+                const ended = (state.finished_at || '') !== (since || '');
+                if (state.is_scanning === false && (sawScanning || ended)) finish(state.new_added > 0);
+            };
+            source.addEventListener('state', apply);
+            source.addEventListener('progress', apply);
+            source.addEventListener('done', (e) => finish(JSON.parse(e.data).new_data));
+            source.onerror = () => {
+                // Connexion SSE impossible : retour au polling
+                source.close();
+                if (this.isScanning) this.pollScanProgress();
+            };
+        },
+
+        pollScanProgress() {
             const interval = setInterval(async () => {
                 if(!this.isScanning) {
                     clearInterval(interval);
@@ -233,8 +270,15 @@ document.addEventListener('alpine:init', () => {
             if(this.currentTab === 'analytics') this.initCharts();
         },
         
-        openModal(item) { 
+        async openModal(item) { 
             this.selectedItem = item; 
+            if (item.impact_analysis !== undefined) return;
+            try {
+                const res = await fetch(`https://technology-watch-spa.onrender.com/news/${item.id}`);
+                if (res.ok) Object.assign(item, await res.json());
+            } catch (e) {
+                console.error('Error fetching news detail:', e);
+            }
         },
         
         getProviderClass(p) { 
@@ -271,13 +315,39 @@ document.addEventListener('alpine:init', () => {
             }, 100);
             
             try {
-                const res = await fetch('https://technology-watch-spa.onrender.com/chat', { 
+                const res = await fetch('https://technology-watch-spa.onrender.com/chat/stream', { 
                     method: 'POST', 
                     headers: {'Content-Type': 'application/json'}, 
                     body: JSON.stringify({ question: userMsg }) 
                 });
-                const data = await res.json();
-                this.chatMessages.push({ role: 'bot', content: marked.parse(data.response) });
+                if (!res.ok || !res.body) throw new Error('Streaming indisponible');
+
+                // Affichage progressif de la réponse (Server-Sent Events)
+                const botMsg = { role: 'bot', content: '' };
+                this.chatMessages.push(botMsg);
+                const msgIndex = this.chatMessages.length - 1;
+                const reader = res.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                let markdown = '';
+
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+                    const events = buffer.split('\n\n');
+                    buffer = events.pop();
+                    for (const evt of events) {
+                        const dataLine = evt.split('\n').find(l => l.startsWith('data: '));
+                        if (!dataLine) continue;
+                        const payload = JSON.parse(dataLine.slice(6));
+                        if (payload.delta) markdown += payload.delta;
+                    }
+                    this.chatMessages[msgIndex].content = marked.parse(markdown);
+                    this.chatLoading = false;
+                    const container = document.getElementById('chatContainer');
+                    if (container) container.scrollTop = container.scrollHeight;
+                }
             } catch (e) { 
                 console.error('Error sending message:', e);
                 this.chatMessages.push({ role: 'bot', content: "Erreur lors de la communication avec l'IA." }); 
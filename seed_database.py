@@ -2,22 +2,11 @@ import os
 import uuid
 from datetime import datetime, timedelta
 import random
-from supabase import create_client, Client
 from dotenv import load_dotenv
 
 # Charger les variables d'environnement
 load_dotenv()
 
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_KEY")
-
-if not url or not key:
-    raise ValueError("⚠️ ERREUR: Les clés SUPABASE_URL ou SUPABASE_KEY sont manquantes.")
-
-supabase: Client = create_client(url, key)
-
-print("🌱 Démarrage du remplissage de la base de données (Historique Réaliste 5 mois)...")
-
 # --- DONNÉES HISTORIQUES RÉALISTES (Derniers 5 mois) ---
 # Basé sur les tendances réelles : Zero-ETL, IA Générative, Gouvernance, Vector Search.
 historical_news = [
@@ -287,34 +276,50 @@ historical_news = [
     }
 ]
 
-count = 0
+def main():
+    url: str = os.environ.get("SUPABASE_URL")
+    key: str = os.environ.get("SUPABASE_KEY")
 
-for news in historical_news:
-    # Génération d'une date passée précise
-    past_date = datetime.now() - timedelta(days=news["days_ago"])
-    formatted_date = past_date.isoformat()
+    if not url or not key:
+        raise ValueError("⚠️ ERREUR: Les clés SUPABASE_URL ou SUPABASE_KEY sont manquantes.")
 
-    # Préparation de l'objet pour Supabase
-    data_to_insert = {
-        "title": news["title"],
-        "link": news["link"], # Lien unique
-        "summary": news["summary"],
-        "provider": news["provider"],
-        "service": news["service"],
-        "category": news["category"],
-        "impact_level": news["impact_level"],
-        "impact_analysis": news["impact_analysis"],
-        "raw_source": f"Official {news['provider']} Source",
-        "created_at": formatted_date # Date simulée réaliste
-    }
+    from supabase import create_client, Client
+    supabase: Client = create_client(url, key)
+
+    print("🌱 Démarrage du remplissage de la base de données (Historique Réaliste 5 mois)...")
+
+    count = 0
+
+    for news in historical_news:
+        # Génération d'une date passée précise
+        past_date = datetime.now() - timedelta(days=news["days_ago"])
+        formatted_date = past_date.isoformat()
+
+        # Préparation de l'objet pour Supabase
+        data_to_insert = {
+            "title": news["title"],
+            "link": news["link"], # Lien unique
+            "summary": news["summary"],
+            "provider": news["provider"],
+            "service": news["service"],
+            "category": news["category"],
+            "impact_level": news["impact_level"],
+            "impact_analysis": news["impact_analysis"],
+            "raw_source": f"Official {news['provider']} Source",
+            "created_at": formatted_date # Date simulée réaliste
+        }
+
+        try:
+            # On utilise upsert pour ne pas planter si on relance le script
+            # On ignore les doublons potentiels basés sur le lien
+            supabase.table("news").upsert(data_to_insert, on_conflict="link").execute()
+            print(f"✅ Ajouté (Il y a {news['days_ago']} jours) : {news['title'][:40]}...")
+            count += 1
+        except Exception as e:
+            print(f"❌ Erreur sur {news['title'][:20]}: {e}")
 
-    try:
-        # On utilise upsert pour ne pas planter si on relance le script
-        # On ignore les doublons potentiels basés sur le lien
-        supabase.table("news").upsert(data_to_insert, on_conflict="link").execute()
-        print(f"✅ Ajouté (Il y a {news['days_ago']} jours) : {news['title'][:40]}...")
-        count += 1
-    except Exception as e:
-        print(f"❌ Erreur sur {news['title'][:20]}: {e}")
+    print(f"\n🎉 Terminé ! {count} articles réalistes (5 derniers mois) ont été ajoutés.")
 
-print(f"\n🎉 Terminé ! {count} articles réalistes (5 derniers mois) ont été ajoutés.")
\ No newline at end of file
+# L'historique est importable (benchmarks) sans rien écrire en base
+if __name__ == "__main__":
+    main()
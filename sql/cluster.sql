@@ -0,0 +1,37 @@
+-- Coordination multi-réplicas (CLUSTER_BACKEND=supabase).
+-- À exécuter une fois dans l'éditeur SQL de Supabase.
+
+-- Baux à expiration : un seul détenteur par nom (leader du scheduler, scan en cours)
+create table if not exists cluster_leases (
+  name text primary key,
+  holder text not null,
+  expires_at timestamptz not null
+);
+
+-- Prend le bail s'il est libre ou expiré, ou le prolonge si on le détient déjà
+create or replace function try_acquire_lease(lease_name text, holder_id text, ttl_seconds int)
+returns boolean
+language plpgsql
+as $$
+begin
+  insert into cluster_leases as l (name, holder, expires_at)
+  values (lease_name, holder_id, now() + make_interval(secs => ttl_seconds))
+  on conflict (name) do update
+     set holder = excluded.holder, expires_at = excluded.expires_at
+   where l.holder = excluded.holder or l.expires_at < now();
+  return found;
+end;
+$$;
+
+-- Dernier état de scan publié, lu par tous les workers
+create table if not exists scan_state (
+  id int primary key,
+  version bigint not null,
+  state jsonb not null
+);
+
+-- Versions partagées (ex. "data" : news modifiées par un worker), lues par tous les workers
+create table if not exists cluster_versions (
+  name text primary key,
+  version bigint not null
+);
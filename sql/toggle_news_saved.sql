@@ -0,0 +1,12 @@
+-- Bascule atomique du favori d'une news, en un seul aller-retour.
+-- Retourne la nouvelle valeur de is_saved (NULL si l'id n'existe pas).
+-- À exécuter une fois dans l'éditeur SQL de Supabase.
+create or replace function toggle_news_saved(item_id news.id%TYPE)
+returns boolean
+language sql
+as $$
+  update news
+     set is_saved = not coalesce(is_saved, false)
+   where id = item_id
+  returning is_saved;
+$$;